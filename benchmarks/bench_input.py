@@ -0,0 +1,143 @@
+"""输入读取方式基准：普通读取 vs 内存映射
+
+对同一个合成的大扫描件，分别用原来的方式（PdfReader(路径) 整个读入内存、
+PyMuPDF 按路径打开）和 pdf_source 的内存映射方式执行：
+
+- index: 解析并遍历所有页面的尺寸和旋转（文档索引的工作量）
+- fragment: 序列化全部页面及其引用的对象（合并的工作量）
+- preview: 打开文档并渲染第一页（需要 PyMuPDF）
+
+每项在独立子进程中运行，记录耗时，以及任务前后常驻内存（RSS）和匿名内存的增量
+（后者只在 Linux 上可得；映射的文件页计入 RSS 但属于页缓存，不计入匿名内存）。
+结果以 JSON 输出：
+
+    python benchmarks/bench_input.py --pages 60 --image-size 1600x2200
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_scan_pdf  # noqa: E402
+
+MODES = ('buffered', 'mmap')
+TASKS = ('index', 'fragment', 'preview')
+PREVIEW_SIZE = 800
+
+
+def memory_usage():
+    """(RSS, 匿名内存)，单位字节；无法获取的项为 None"""
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return (int(fields['VmRSS'].split()[0]) * 1024,
+                int(fields['RssAnon'].split()[0]) * 1024)
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None, None
+    return psutil.Process().memory_info().rss, None
+
+
+def open_reader(mode, pdf_path):
+    from PyPDF2 import PdfReader
+
+    from pdf_source import open_pdf_reader
+
+    return PdfReader(pdf_path) if mode == 'buffered' else open_pdf_reader(pdf_path)
+
+
+def run_task(task, mode, pdf_path):
+    # 先导入用到的模块，使 RSS 增量只反映读取输入本身
+    import PyPDF2  # noqa: F401
+
+    import stream_writer
+    from render_backend import load_fitz
+
+    fitz = load_fitz() if task == 'preview' else None
+    if task == 'preview' and fitz is None:
+        return {'task': task, 'mode': mode, 'error': "未安装 PyMuPDF"}
+    rss_before, anon_before = memory_usage()
+
+    start = time.perf_counter()
+    if task == 'index':
+        reader = open_reader(mode, pdf_path)
+        for page in reader.pages:
+            page.mediabox
+            stream_writer.page_rotation(page)
+    elif task == 'fragment':
+        reader = open_reader(mode, pdf_path)
+        fragment = stream_writer.build_fragment(reader)  # noqa: F841  保留结果，计入内存增量
+    else:
+        from pdf_source import open_fitz_document
+
+        doc = fitz.open(pdf_path) if mode == 'buffered' else open_fitz_document(fitz, pdf_path)
+        page = doc[0]
+        zoom = PREVIEW_SIZE / max(page.rect.width, page.rect.height)
+        page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    elapsed = time.perf_counter() - start
+
+    rss_after, anon_after = memory_usage()
+    return {
+        'task': task,
+        'mode': mode,
+        'ms': round(elapsed * 1000, 1),
+        'rss_delta_bytes': None if rss_after is None else rss_after - rss_before,
+        'anon_delta_bytes': None if anon_after is None else anon_after - anon_before,
+    }
+
+
+def run_child(task, mode, pdf_path):
+    command = [sys.executable, os.path.abspath(__file__), '--run', task, mode, pdf_path]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def parse_size(text):
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比较普通读取与内存映射读取输入 PDF")
+    parser.add_argument('--pages', type=int, default=60, help="合成扫描件的页数")
+    parser.add_argument('--image-size', type=parse_size, default=(1600, 2200),
+                        metavar='宽x高', help="每页图像的像素尺寸")
+    parser.add_argument('--input', help="改用已有的 PDF 文件")
+    parser.add_argument('--tasks', nargs='+', choices=TASKS, default=list(TASKS))
+    parser.add_argument('--run', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        print(json.dumps(run_task(*args.run)))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix='pdfmerger_input_') as work_dir:
+        pdf_path = args.input
+        if pdf_path is None:
+            pdf_path = os.path.join(work_dir, 'scan.pdf')
+            make_scan_pdf(pdf_path, args.pages, args.image_size)
+        results = [run_child(task, mode, pdf_path) for task in args.tasks for mode in MODES]
+        input_bytes = os.path.getsize(pdf_path)
+
+    print(json.dumps({
+        'benchmark': 'input',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'input_bytes': input_bytes,
+        'results': results,
+    }, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
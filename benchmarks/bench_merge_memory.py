@@ -0,0 +1,76 @@
+"""合并峰值内存基准
+
+分别以内存模式和流式模式合并同一组合成扫描件，每种模式在独立子进程中运行，
+用 tracemalloc 记录 Python 堆的峰值，以 JSON 输出结果。
+
+    python benchmarks/bench_merge_memory.py --files 4 --pages 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_corpus  # noqa: E402
+from merge_engine import merge_files  # noqa: E402
+
+
+def run_once(mode, inputs, output_path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    pages = merge_files(inputs, output_path, streaming=(mode == 'streaming')).pages_done
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'mode': mode,
+        'pages': pages,
+        'seconds': round(elapsed, 3),
+        'peak_bytes': peak,
+        'output_bytes': os.path.getsize(output_path),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="合并峰值内存基准")
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--run', choices=['memory', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--inputs', nargs='*', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        # 子进程：只执行一种模式
+        print(json.dumps(run_once(args.run, args.inputs, args.output)))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix='pdfmerger_bench_') as work_dir:
+        inputs = make_corpus(os.path.join(work_dir, 'corpus'), args.files, args.pages)
+        largest_input = max(os.path.getsize(p) for p in inputs)
+        results = []
+        for mode in ('memory', 'streaming'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run', mode,
+                 '--output', os.path.join(work_dir, f'{mode}.pdf'), '--inputs', *inputs],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results.append(json.loads(output))
+
+    print(json.dumps({
+        'benchmark': 'merge_memory',
+        'files': args.files,
+        'pages_per_file': args.pages,
+        'largest_input_bytes': largest_input,
+        'results': results,
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""启动时间基准
+
+在独立子进程中启动界面，测量到首次绘制窗口为止的各阶段耗时（毫秒）：
+
+- interpreter: 从启动子进程到开始执行脚本（Python 解释器自身的启动）
+- import: 导入 pdf_merger
+- init: 创建 Tk 根窗口和 PDFMergerApp
+- first_paint: 窗口映射到屏幕并完成第一轮重绘
+- total: 从启动子进程到首次绘制
+
+每项重复多次取中位数，结果以 JSON 输出。需要图形环境（Linux 下需设置 DISPLAY）。
+
+    python benchmarks/bench_startup.py --repeats 5
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ('interpreter', 'import', 'init', 'first_paint', 'total')
+
+
+def run_once():
+    """子进程：启动界面直到首次绘制，打印各阶段的时间点"""
+    marks = {'script': time.time()}
+    sys.path.insert(0, ROOT_DIR)
+    os.chdir(ROOT_DIR)
+
+    start = time.perf_counter()
+    import tkinter as tk
+    import pdf_merger
+    imported = time.perf_counter()
+
+    root = tk.Tk()
+    pdf_merger.PDFMergerApp(root)
+    initialized = time.perf_counter()
+
+    mapped = []
+    root.bind('<Map>', lambda e: mapped.append(True) if e.widget is root else None)
+    while not mapped:
+        root.update()
+    root.update_idletasks()
+    painted = time.perf_counter()
+    root.destroy()
+
+    marks['import'] = imported - start
+    marks['init'] = initialized - imported
+    marks['first_paint'] = painted - initialized
+    marks['painted'] = marks['script'] + (painted - start)
+    print(json.dumps(marks))
+
+
+def measure():
+    spawned = time.time()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run'],
+        check=True, capture_output=True, text=True
+    ).stdout
+    marks = json.loads(output.strip().splitlines()[-1])
+    return {
+        'interpreter': (marks['script'] - spawned) * 1000,
+        'import': marks['import'] * 1000,
+        'init': marks['init'] * 1000,
+        'first_paint': marks['first_paint'] * 1000,
+        'total': (marks['painted'] - spawned) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量启动到首次绘制的时间")
+    parser.add_argument('--repeats', type=int, default=5, help="重复次数，结果取中位数")
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        run_once()
+        return 0
+
+    if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+        print("错误: 需要图形环境，请设置 DISPLAY（例如在 xvfb-run 下运行）", file=sys.stderr)
+        return 1
+
+    runs = []
+    for _ in range(max(args.repeats, 1)):
+        try:
+            runs.append(measure())
+        except subprocess.CalledProcessError as e:
+            print(f"错误: 启动失败\n{e.stderr}", file=sys.stderr)
+            return 1
+
+    median = {
+        stage: round(sorted(run[stage] for run in runs)[len(runs) // 2], 1)
+        for stage in STAGES
+    }
+    results = {
+        'benchmark': 'startup',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeats': len(runs),
+        'median_ms': median,
+        'runs_ms': [{stage: round(run[stage], 1) for stage in STAGES} for run in runs],
+    }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""合并与预览基准套件
+
+为每种合成语料（大量小文件、少量大文件、图像密集、字体密集）在独立子进程中
+运行各合并模式，记录吞吐量（页/秒）、峰值 RSS 和输出大小；再测量首次预览
+（打开文档 + 渲染）与重复预览的延迟。结果以 JSON 输出，可与以前的结果对比：
+
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --scale 0.2 --profiles many_small font_heavy
+    python benchmarks/bench_suite.py --compare baseline.json --tolerance 0.15
+
+--compare 时，吞吐量下降、峰值内存或输出大小增加、预览变慢超过容差的指标
+会列在 regressions 中，并以退出码 1 结束。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CORPUS_PROFILES, make_profile  # noqa: E402
+
+MERGE_MODES = ('memory', 'streaming', 'dedup', 'parallel')
+PREVIEW_SIZE = 800
+PREVIEW_REPEATS = 5
+# merge_files 在 workers <= 1 时走串行路径，parallel 模式至少用 2 个进程才名副其实
+PARALLEL_MIN_WORKERS = 2
+
+# 指标名 -> 数值越大越好时为 True
+_METRICS = {
+    'pages_per_second': True,
+    'peak_rss_bytes': False,
+    'output_bytes': False,
+    'first_ms': False,
+    'repeat_ms': False,
+    'disk_cache_ms': False,
+}
+
+
+def peak_rss_bytes():
+    """当前进程的峰值常驻内存；无法获取时返回 None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_merge(mode, inputs, output_path, workers):
+    from merge_engine import merge_files
+
+    workers = max(workers, PARALLEL_MIN_WORKERS) if mode == 'parallel' else 1
+    start = time.perf_counter()
+    result = merge_files(
+        inputs, output_path,
+        streaming=(mode == 'streaming'),
+        dedup=(mode == 'dedup'),
+        workers=workers
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        'mode': mode,
+        'workers': workers,
+        'pages': result.pages_done,
+        'seconds': round(elapsed, 3),
+        'pages_per_second': round(result.pages_done / elapsed, 1) if elapsed else None,
+        # 并行模式下只包含主进程，子进程的内存不计入
+        'peak_rss_bytes': peak_rss_bytes(),
+        'output_bytes': os.path.getsize(output_path),
+    }
+
+
+def run_preview(pdf_path, cache_dir):
+    """首次预览（含打开文档）、重复预览和磁盘缓存命中的延迟，单位毫秒"""
+    from preview_cache import DiskRenderCache
+    from render_backend import create_renderer
+
+    try:
+        renderer = create_renderer()
+        start = time.perf_counter()
+        img = renderer.render_page(pdf_path, 0, scale_to=PREVIEW_SIZE)
+        first = time.perf_counter() - start
+
+        timings = []
+        for _ in range(PREVIEW_REPEATS):
+            start = time.perf_counter()
+            renderer.render_page(pdf_path, 0, scale_to=PREVIEW_SIZE)
+            timings.append(time.perf_counter() - start)
+        renderer.close()
+
+        disk_cache = DiskRenderCache(cache_dir)
+        key = disk_cache.make_key(pdf_path, 0, None, size=PREVIEW_SIZE)
+        disk_cache.put(key, img)
+        start = time.perf_counter()
+        disk_cache.get(key)
+        disk = time.perf_counter() - start
+    except Exception as e:
+        return {'error': str(e)}
+    return {
+        'renderer': type(renderer).__name__,
+        'size': PREVIEW_SIZE,
+        'first_ms': round(first * 1000, 1),
+        'repeat_ms': round(sorted(timings)[len(timings) // 2] * 1000, 1),
+        'disk_cache_ms': round(disk * 1000, 1),
+    }
+
+
+def run_child(args):
+    """在独立子进程中执行一次测量，保证峰值内存互不影响"""
+    command = [sys.executable, os.path.abspath(__file__), '--run', *args]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def run_profile(name, work_dir, scale, modes, workers):
+    corpus_dir = os.path.join(work_dir, name)
+    start = time.perf_counter()
+    inputs = make_profile(name, corpus_dir, scale)
+    generated = time.perf_counter() - start
+    list_path = os.path.join(work_dir, f'{name}.inputs')
+    with open(list_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(inputs))
+
+    merges = []
+    for mode in modes:
+        output_path = os.path.join(work_dir, f'{name}_{mode}.pdf')
+        merges.append(run_child(['merge', mode, list_path, output_path, str(workers)]))
+        os.remove(output_path)
+    preview = run_child(['preview', inputs[0], os.path.join(work_dir, 'render_cache')])
+
+    return {
+        'profile': name,
+        'files': len(inputs),
+        'input_bytes': sum(os.path.getsize(p) for p in inputs),
+        'generate_seconds': round(generated, 3),
+        'merges': merges,
+        'preview': preview,
+    }
+
+
+def _index_results(results):
+    """把结果展开为 {(配置, 模式/preview, 指标): 数值}"""
+    values = {}
+    for profile in results.get('profiles', ()):
+        for merge in profile.get('merges', ()):
+            for metric in _METRICS:
+                if merge.get(metric) is not None:
+                    values[(profile['profile'], merge['mode'], metric)] = merge[metric]
+        for metric in _METRICS:
+            value = profile.get('preview', {}).get(metric)
+            if value is not None:
+                values[(profile['profile'], 'preview', metric)] = value
+    return values
+
+
+def compare(baseline, current, tolerance):
+    """返回超过容差的退化项列表"""
+    old_values = _index_results(baseline)
+    regressions = []
+    for key, new in _index_results(current).items():
+        old = old_values.get(key)
+        if not old:
+            continue
+        change = (new - old) / old
+        higher_is_better = _METRICS[key[2]]
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append({
+                'profile': key[0], 'mode': key[1], 'metric': key[2],
+                'baseline': old, 'current': new, 'change': round(change, 3),
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="合并与预览基准套件")
+    parser.add_argument('--profiles', nargs='+', choices=sorted(CORPUS_PROFILES),
+                        default=list(CORPUS_PROFILES), help="要运行的语料配置")
+    parser.add_argument('--modes', nargs='+', choices=MERGE_MODES, default=list(MERGE_MODES),
+                        help="要测量的合并模式")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="语料规模系数，调小可快速试跑")
+    parser.add_argument('-j', '--jobs', type=int,
+                        default=max(os.cpu_count() or 1, PARALLEL_MIN_WORKERS),
+                        help=f"parallel 模式的进程数（至少 {PARALLEL_MIN_WORKERS}）")
+    parser.add_argument('--output', help="把结果另存为 JSON 文件")
+    parser.add_argument('--compare', metavar='BASELINE', help="与以前的结果对比")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="对比时允许的相对变化（默认 0.15）")
+    parser.add_argument('--run', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        # 子进程：执行单项测量
+        kind, *params = args.run
+        if kind == 'merge':
+            mode, list_path, output_path, workers = params
+            with open(list_path, encoding='utf-8') as f:
+                inputs = f.read().splitlines()
+            result = run_merge(mode, inputs, output_path, int(workers))
+        else:
+            result = run_preview(*params)
+        print(json.dumps(result))
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix='pdfmerger_suite_') as work_dir:
+        profiles = []
+        for name in args.profiles:
+            print(f"运行 {name} ...", file=sys.stderr)
+            profiles.append(run_profile(name, work_dir, args.scale, args.modes, args.jobs))
+
+    results = {
+        'benchmark': 'suite',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'scale': args.scale,
+        'jobs': args.jobs,
+        'profiles': profiles,
+    }
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            results['regressions'] = compare(json.load(f), results, args.tolerance)
+        exit_code = 1 if results['regressions'] else 0
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
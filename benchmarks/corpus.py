@@ -0,0 +1,195 @@
+"""基准测试用的合成 PDF 生成器
+
+直接按 PDF 语法写出文件，不依赖 PyPDF2 的写入器，生成速度快且结果可复现。
+"""
+import os
+import random
+
+
+class RawPdfBuilder:
+    """最小化的 PDF 构造器：按顺序追加对象，最后写出页面树和交叉引用表"""
+
+    def __init__(self):
+        self._objects = [None, None]  # 1: Catalog, 2: Pages
+        self._page_ids = []
+
+    def add_object(self, body, stream=None):
+        """追加一个对象，返回对象编号；stream 不为 None 时写成流对象"""
+        if stream is not None:
+            body = body.rstrip()
+            assert body.endswith(b'>>')
+            body = (body[:-2] + b' /Length %d >>\nstream\n' % len(stream)
+                    + stream + b'\nendstream')
+        self._objects.append(body)
+        return len(self._objects)
+
+    def add_page(self, content, resources=b'<< >>', width=595, height=842):
+        content_id = self.add_object(b'<< >>', content)
+        page_id = self.add_object(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources %s /Contents %d 0 R >>' % (width, height, resources, content_id)
+        )
+        self._page_ids.append(page_id)
+        return page_id
+
+    def write(self, path):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self._page_ids)
+        self._objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+        self._objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self._page_ids))
+
+        with open(path, 'wb') as f:
+            f.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+            offsets = []
+            for obj_id, body in enumerate(self._objects, start=1):
+                offsets.append(f.tell())
+                f.write(b'%d 0 obj\n' % obj_id + body + b'\nendobj\n')
+            xref_offset = f.tell()
+            f.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(self._objects) + 1))
+            for offset in offsets:
+                f.write(b'%010d 00000 n \n' % offset)
+            f.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (len(self._objects) + 1, xref_offset))
+
+
+def make_scan_pdf(path, page_count, image_size=(1000, 1400), seed=0):
+    """生成图像为主的“扫描件”：每页一张未压缩的灰度噪声图"""
+    rng = random.Random(seed)
+    width, height = image_size
+    builder = RawPdfBuilder()
+    for _ in range(page_count):
+        pixels = rng.randbytes(width * height)
+        image_id = builder.add_object(
+            b'<< /Type /XObject /Subtype /Image /Width %d /Height %d '
+            b'/ColorSpace /DeviceGray /BitsPerComponent 8 >>' % (width, height),
+            pixels
+        )
+        builder.add_page(
+            b'q 595 0 0 842 0 0 cm /Im0 Do Q',
+            resources=b'<< /XObject << /Im0 %d 0 R >> >>' % image_id
+        )
+    builder.write(path)
+    return path
+
+
+# 文本中使用的字符，不含需要转义的 ( ) \\
+_TEXT_CHARS = ''.join(chr(c) for c in range(32, 127) if chr(c) not in '()\\')
+
+
+def _type3_font(builder, rng, glyph_points=40):
+    """生成一个内嵌的 Type3 字体：每个可打印 ASCII 字符一个随机多边形字形"""
+    char_procs = []
+    for code in range(32, 127):
+        points = ' '.join(
+            f"{rng.randrange(1000)} {rng.randrange(1000)} l" for _ in range(glyph_points)
+        )
+        proc_id = builder.add_object(
+            b'<< >>', f"600 0 0 0 600 1000 d1\n0 0 m {points} h f".encode('ascii')
+        )
+        char_procs.append(b'/g%d %d 0 R' % (code, proc_id))
+    names = b' '.join(b'/g%d' % code for code in range(32, 127))
+    return builder.add_object(
+        b'<< /Type /Font /Subtype /Type3 /FontBBox [0 0 1000 1000] '
+        b'/FontMatrix [0.001 0 0 0.001 0 0] /CharProcs << %s >> '
+        b'/Encoding << /Type /Encoding /Differences [32 %s] >> '
+        b'/FirstChar 32 /LastChar 126 /Widths [%s] /Resources << >> >>'
+        % (b' '.join(char_procs), names, b' '.join([b'600'] * 95))
+    )
+
+
+def _text_content(rng, font_names, lines=60, line_length=90):
+    parts = [b'BT 12 TL 40 800 Td']
+    for i in range(lines):
+        text = ''.join(rng.choice(_TEXT_CHARS) for _ in range(line_length))
+        font = font_names[i % len(font_names)]
+        parts.append(b'/%s 10 Tf (%s) \'' % (font, text.encode('ascii')))
+    parts.append(b'ET')
+    return b'\n'.join(parts)
+
+
+def make_text_pdf(path, page_count, fonts=0, lines=60, seed=0, font_seed=0):
+    """生成文本页面
+
+    fonts=0 时使用不内嵌的标准字体 Helvetica，文件很小；fonts>0 时每个文件
+    内嵌 fonts 个 Type3 字体（“字体密集”）。字体由 font_seed 决定，相同
+    font_seed 的文件内嵌的字体完全相同，可用于衡量去重效果。
+    """
+    rng = random.Random(seed)
+    builder = RawPdfBuilder()
+    if fonts:
+        font_rng = random.Random(font_seed)
+        font_ids = [_type3_font(builder, font_rng) for _ in range(fonts)]
+    else:
+        font_ids = [builder.add_object(
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')]
+    font_names = [b'F%d' % i for i in range(len(font_ids))]
+    resources = b'<< /Font << %s >> >>' % b' '.join(
+        b'/%s %d 0 R' % (name, font_id) for name, font_id in zip(font_names, font_ids))
+    for _ in range(page_count):
+        builder.add_page(_text_content(rng, font_names, lines), resources=resources)
+    builder.write(path)
+    return path
+
+
+def _scaled(value, scale):
+    return max(1, int(round(value * scale)))
+
+
+def make_many_small(directory, scale=1.0):
+    """大量 1~3 页的小文件"""
+    rng = random.Random(0)
+    return [
+        make_text_pdf(os.path.join(directory, f'small_{i:04d}.pdf'),
+                      rng.randint(1, 3), lines=20, seed=i)
+        for i in range(_scaled(200, scale))
+    ]
+
+
+def make_few_huge(directory, scale=1.0):
+    """少量页数很多的大文件"""
+    return [
+        make_text_pdf(os.path.join(directory, f'huge_{i}.pdf'),
+                      _scaled(1000, scale), seed=i)
+        for i in range(2)
+    ]
+
+
+def make_image_heavy(directory, scale=1.0):
+    """以未压缩图像为主的扫描件"""
+    return [
+        make_scan_pdf(os.path.join(directory, f'scan_{i:03d}.pdf'),
+                      _scaled(8, scale), image_size=(800, 1100), seed=i)
+        for i in range(6)
+    ]
+
+
+def make_font_heavy(directory, scale=1.0):
+    """每个文件内嵌多个相同的 Type3 字体"""
+    return [
+        make_text_pdf(os.path.join(directory, f'fonts_{i:03d}.pdf'),
+                      5, fonts=4, seed=i)
+        for i in range(_scaled(20, scale))
+    ]
+
+
+# 基准语料配置：名称 -> 生成函数(目录, 规模系数)，返回文件路径列表
+CORPUS_PROFILES = {
+    'many_small': make_many_small,
+    'few_huge': make_few_huge,
+    'image_heavy': make_image_heavy,
+    'font_heavy': make_font_heavy,
+}
+
+
+def make_profile(name, directory, scale=1.0):
+    os.makedirs(directory, exist_ok=True)
+    return CORPUS_PROFILES[name](directory, scale)
+
+
+def make_corpus(directory, files=4, pages_per_file=10, image_size=(1000, 1400)):
+    """在 directory 下生成一组扫描件，返回文件路径列表"""
+    os.makedirs(directory, exist_ok=True)
+    return [
+        make_scan_pdf(os.path.join(directory, f'scan_{i:03d}.pdf'),
+                      pages_per_file, image_size, seed=i)
+        for i in range(files)
+    ]
@@ -0,0 +1,179 @@
+"""页面组合
+
+合并的基本单位从“整个文件”细化为“某个文件的某一页”：Composition 是
+(源文件, 页码, 旋转) 的有序列表，例如“A 的第 3–40 页，然后 B 全部，
+再接 A 的第 1 页”。合并时每个源文件只打开一次，页面按组合中的顺序输出。
+移动、删除等编辑操作都是一次线性重建，与选中的条目数无关，均为 O(n)。
+"""
+
+
+class PageEntry:
+    """组合中的一页：源文件、页码（从0开始）和额外的顺时针旋转角度"""
+
+    __slots__ = ('source', 'page', 'rotation')
+
+    def __init__(self, source, page, rotation=0):
+        self.source = source
+        self.page = page
+        self.rotation = rotation % 360
+
+    def __repr__(self):
+        return f"PageEntry({self.source!r}, {self.page}, {self.rotation})"
+
+
+def parse_page_ranges(spec, page_count):
+    """解析页码范围，如 "3-40,45,50-"（从1开始，含两端），返回从0开始的页码列表
+
+    空字符串表示全部页面；"50-" 表示第 50 页到最后一页。
+    """
+    spec = spec.strip()
+    if not spec:
+        return list(range(page_count))
+    pages = []
+    for part in spec.split(','):
+        part = part.strip()
+        try:
+            if '-' in part:
+                start, end = part.split('-', 1)
+                start = int(start) if start.strip() else 1
+                end = int(end) if end.strip() else page_count
+            else:
+                start = end = int(part)
+        except ValueError:
+            raise ValueError(f"无效的页码范围: {part}")
+        if not 1 <= start <= end <= page_count:
+            raise ValueError(f"页码范围超出 1-{page_count}: {part}")
+        pages.extend(range(start - 1, end))
+    return pages
+
+
+def move_items(items, indices, target):
+    """把 items 中 indices 处的元素保持相对顺序整体移到 target 之前
+
+    target 为移动前的序号，等于 len(items) 时移到末尾。
+    返回 (新列表, 被移动元素的新序号)；一次线性重建，与选中的元素数无关。
+    """
+    selected = set(indices)
+    moved = []
+    kept = []
+    insert_at = None
+    for i, item in enumerate(items):
+        if i == target:
+            insert_at = len(kept)
+        (moved if i in selected else kept).append(item)
+    if insert_at is None:
+        insert_at = len(kept)
+    new_indices = list(range(insert_at, insert_at + len(moved)))
+    return kept[:insert_at] + moved + kept[insert_at:], new_indices
+
+
+class Composition:
+    """(源文件, 页码, 旋转) 的有序列表
+
+    seen_sources 记录曾经加入过页面的源文件：用户删光某个文件的页面后，
+    sync_sources() 不会再把它的页面加回来。
+    """
+
+    def __init__(self, entries=None):
+        self.entries = list(entries or ())
+        self.seen_sources = {entry.source for entry in self.entries}
+
+    @classmethod
+    def from_files(cls, inputs, page_count, rotations=None):
+        """按文件顺序取全部页面；page_count(path) 返回页数，rotations 同 file_rotations"""
+        composition = cls()
+        for pdf_file in inputs:
+            composition.add_pages(pdf_file, range(page_count(pdf_file)),
+                                  (rotations or {}).get(pdf_file))
+        return composition
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def add_pages(self, source, pages, rotations=None, index=None):
+        """在 index 处（默认末尾）插入 source 的若干页"""
+        rotations = rotations or {}
+        new_entries = [PageEntry(source, page, rotations.get(page, 0)) for page in pages]
+        if index is None:
+            self.entries.extend(new_entries)
+        else:
+            self.entries[index:index] = new_entries
+        if new_entries:
+            self.seen_sources.add(source)
+        return len(new_entries)
+
+    def move(self, indices, target):
+        """把 indices 处的条目整体移到 target 之前，返回其新序号；见 move_items()"""
+        self.entries, moved = move_items(self.entries, indices, target)
+        return moved
+
+    def remove(self, indices):
+        selected = set(indices)
+        self.entries = [entry for i, entry in enumerate(self.entries) if i not in selected]
+
+    def rotate(self, indices, angle=90):
+        for i in indices:
+            entry = self.entries[i]
+            entry.rotation = (entry.rotation + angle) % 360
+
+    def rotate_page(self, source, page, angle=90):
+        """旋转 source 第 page 页在组合中的每一次出现"""
+        self.rotate(
+            [i for i, entry in enumerate(self.entries)
+             if entry.source == source and entry.page == page],
+            angle
+        )
+
+    def remove_source(self, source):
+        self.entries = [entry for entry in self.entries if entry.source != source]
+
+    def sync_sources(self, files, page_count):
+        """与文件列表同步：删除已移除文件的页面，新文件的全部页面追加到末尾
+
+        只追加从未加入过页面的文件（尚无页数的文件下次同步时再追加）；
+        页面被用户全部删除的文件保持删除。
+        """
+        files_set = set(files)
+        self.entries = [entry for entry in self.entries if entry.source in files_set]
+        # 从文件列表中移除的文件再次添加时视为新文件
+        self.seen_sources &= files_set
+        for pdf_file in files:
+            if pdf_file not in self.seen_sources:
+                self.add_pages(pdf_file, range(page_count(pdf_file)))
+
+    def sources(self):
+        """按首次出现的顺序返回用到的源文件"""
+        return list(dict.fromkeys(entry.source for entry in self.entries))
+
+    def selections(self):
+        """按源文件分组：{源文件: [(输出位置, 页码, 旋转), ...]}，键按首次出现排序"""
+        groups = {}
+        for position, entry in enumerate(self.entries):
+            groups.setdefault(entry.source, []).append(
+                (position, entry.page, entry.rotation))
+        return groups
+
+
+def parse_composition(items, inputs, page_count):
+    """解析命令行的页面组合，每项为 "文件序号[:页码范围]"，如 ["1:3-40", "2", "1:1"]
+
+    文件序号从1开始；省略页码范围表示全部页面。page_count(path) 返回页数。
+    """
+    composition = Composition()
+    for item in items:
+        file_part, _, range_part = item.partition(':')
+        try:
+            file_no = int(file_part)
+        except ValueError:
+            raise ValueError(f"无效的文件序号: {item}")
+        if not 1 <= file_no <= len(inputs):
+            raise ValueError(f"文件序号超出范围: {item}")
+        pdf_file = inputs[file_no - 1]
+        composition.add_pages(pdf_file, parse_page_ranges(range_part, page_count(pdf_file)))
+    return composition
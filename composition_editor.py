@@ -0,0 +1,199 @@
+"""页面编排窗口
+
+编辑 app.composition：按页码范围添加页面、多选后整体移动、旋转或删除。
+每次修改后整表重建列表内容（一次 delete + 一次 insert），大量条目时也只是 O(n)。
+"""
+import os
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from composition import Composition, parse_page_ranges
+
+
+class CompositionEditor:
+    """页面编排窗口，关闭后编排结果保留在 app.composition 中"""
+
+    def __init__(self, app):
+        self.app = app
+        self.window = tk.Toplevel(app.root)
+        self.window.title("页面编排")
+        self.window.geometry("560x640")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.setup_ui()
+        self.refresh()
+
+    @property
+    def composition(self):
+        return self.app.composition
+
+    def setup_ui(self):
+        colors = self.app.colors
+        frame = ttk.Frame(self.window, padding=15)
+        frame.pack(fill='both', expand=True)
+
+        # 添加页面：选择文件并输入页码范围
+        add_frame = ttk.Frame(frame)
+        add_frame.pack(fill='x', pady=(0, 10))
+        self.source_var = tk.StringVar()
+        self.source_box = ttk.Combobox(
+            add_frame, textvariable=self.source_var, state='readonly', width=24
+        )
+        self.source_box.pack(side='left')
+        self.range_var = tk.StringVar()
+        ttk.Entry(add_frame, textvariable=self.range_var, width=14).pack(side='left', padx=5)
+        ttk.Button(
+            add_frame, text="添加页面", style='Primary.TButton', command=self.add_pages
+        ).pack(side='left')
+        ttk.Label(
+            frame,
+            text="页码范围如 3-40,45,50-，留空表示全部页面；插入到所选位置之前",
+            foreground=colors['light_text']
+        ).pack(fill='x', pady=(0, 10))
+
+        list_container = ttk.Frame(frame)
+        list_container.pack(fill='both', expand=True)
+        self.listbox = tk.Listbox(
+            list_container,
+            selectmode=tk.EXTENDED,
+            font=('Microsoft YaHei UI', 10),
+            bg=colors['bg'],
+            fg=colors['text'],
+            selectbackground=colors['selected'],
+            selectforeground=colors['text'],
+            activestyle='none',
+            relief='flat',
+            borderwidth=0,
+            highlightthickness=0
+        )
+        scrollbar = ttk.Scrollbar(
+            list_container,
+            orient="vertical",
+            style="Custom.Vertical.TScrollbar",
+            command=self.listbox.yview
+        )
+        self.listbox.config(yscrollcommand=scrollbar.set)
+        self.listbox.grid(row=0, column=0, sticky="nsew", padx=(0, 5))
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        list_container.grid_columnconfigure(0, weight=1)
+        list_container.grid_rowconfigure(0, weight=1)
+        self.listbox.bind('<Double-Button-1>', self.on_double_click)
+
+        self.summary_label = ttk.Label(frame, foreground=colors['light_text'])
+        self.summary_label.pack(fill='x', pady=(10, 0))
+
+        control_frame = ttk.Frame(frame)
+        control_frame.pack(fill='x', pady=(10, 0))
+        for text, command in [
+            ("置顶", self.move_to_top),
+            ("上移", lambda: self.move_by(-1)),
+            ("下移", lambda: self.move_by(1)),
+            ("置底", self.move_to_bottom),
+            ("旋转", self.rotate_selected),
+            ("删除", self.remove_selected)
+        ]:
+            ttk.Button(
+                control_frame, text=text, command=command, style='Primary.TButton', width=5
+            ).pack(side='left', padx=(0, 5))
+
+        reset_frame = ttk.Frame(frame)
+        reset_frame.pack(fill='x', pady=(10, 0))
+        ttk.Button(
+            reset_frame, text="重置为全部页面", command=self.reset
+        ).pack(side='left')
+        ttk.Button(
+            reset_frame, text="恢复按文件合并", command=self.discard
+        ).pack(side='left', padx=(10, 0))
+
+    def close(self):
+        """关闭窗口；编排仍然生效，主窗口显示提示直到恢复按文件合并"""
+        self.app.composition_editor = None
+        self.window.destroy()
+        self.app.update_composition_indicator()
+
+    def entry_text(self, entry):
+        text = f"{os.path.basename(entry.source)}  第 {entry.page + 1} 页"
+        return f"{text}  ↻{entry.rotation}°" if entry.rotation else text
+
+    def refresh(self, selection=()):
+        """按当前编排整表重建列表，并恢复选中项"""
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *(self.entry_text(entry) for entry in self.composition))
+        for index in selection:
+            self.listbox.selection_set(index)
+        if selection:
+            self.listbox.see(selection[0])
+
+        sources = [os.path.basename(path) for path in self.app.pdf_files]
+        self.source_box.configure(values=sources)
+        if sources and self.source_var.get() not in sources:
+            self.source_var.set(sources[0])
+        self.summary_label.configure(
+            text=f"共 {len(self.composition)} 页，来自 {len(self.composition.sources())} 个文件"
+        )
+        self.app.update_composition_indicator()
+
+    def selected(self):
+        return list(self.listbox.curselection())
+
+    def add_pages(self):
+        if self.source_box.current() < 0:
+            return
+        pdf_path = self.app.pdf_files[self.source_box.current()]
+        try:
+            pages = parse_page_ranges(self.range_var.get(), self.app.doc_index.page_count(pdf_path))
+        except ValueError as e:
+            messagebox.showerror("错误", str(e), parent=self.window)
+            return
+        selection = self.selected()
+        index = selection[0] if selection else len(self.composition)
+        count = self.composition.add_pages(pdf_path, pages, index=index)
+        self.refresh(range(index, index + count))
+
+    def move_to(self, target):
+        selection = self.selected()
+        if selection:
+            self.refresh(self.composition.move(selection, target))
+
+    def move_to_top(self):
+        self.move_to(0)
+
+    def move_to_bottom(self):
+        self.move_to(len(self.composition))
+
+    def move_by(self, step):
+        selection = self.selected()
+        if not selection:
+            return
+        if step < 0:
+            self.move_to(max(selection[0] + step, 0))
+        else:
+            # 插入到最后一个选中项之后第 step 项的后面
+            self.move_to(min(selection[-1] + step + 1, len(self.composition)))
+
+    def rotate_selected(self):
+        selection = self.selected()
+        if selection:
+            self.composition.rotate(selection)
+            self.refresh(selection)
+
+    def remove_selected(self):
+        selection = self.selected()
+        if selection:
+            self.composition.remove(selection)
+            self.refresh()
+
+    def on_double_click(self, event):
+        selection = self.selected()
+        if selection:
+            entry = self.composition[selection[0]]
+            self.app.show_page(entry.source, entry.page)
+
+    def reset(self):
+        self.app.composition = Composition.from_files(
+            self.app.pdf_files, self.app.page_count_or_zero, self.app.file_rotations
+        )
+        self.refresh()
+
+    def discard(self):
+        """放弃编排，合并恢复为按文件顺序输出全部页面"""
+        self.app.discard_composition()
@@ -0,0 +1,49 @@
+"""批量添加文件
+
+path_key() 把路径规范为真实路径（解析符号链接，Windows 上忽略大小写），
+已添加的文件按它保存在集合中，去重为 O(1)；同一文件经不同路径添加也能识别。
+expand_paths() 把其中的目录递归展开为目录下的全部 PDF。
+"""
+import os
+
+
+def path_key(path):
+    """用于去重的规范路径"""
+    return os.path.normcase(os.path.realpath(path))
+
+
+def find_pdf_files(directory):
+    """递归列出 directory 中的 PDF 文件，按目录和文件名排序，不跟随目录符号链接"""
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort(key=str.lower)
+        found.extend(
+            os.path.join(root, name)
+            for name in sorted(files, key=str.lower)
+            if name.lower().endswith('.pdf')
+        )
+    return found
+
+
+def expand_paths(paths):
+    """按顺序产出文件路径，目录展开为其中的 PDF"""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from find_pdf_files(path)
+        else:
+            yield path
+
+
+def new_files(paths, known_keys, key=path_key):
+    """返回 paths 中尚未添加的文件及其规范路径 [(路径, 规范路径)]，并把它们记入 known_keys
+
+    同一批中重复的只保留第一个。key(path) 返回去重用的规范路径；
+    可传入预先（如在后台线程中）算好的映射的查找函数。
+    """
+    added = []
+    for path in paths:
+        key_of_path = key(path)
+        if key_of_path not in known_keys:
+            known_keys.add(key_of_path)
+            added.append((path, key_of_path))
+    return added
@@ -0,0 +1,110 @@
+"""文件列表模型
+
+FileList 是界面中文件顺序的唯一来源：列表框只负责显示，所有增删、移动、排序
+都先改这里，再把受影响的行一次性刷新到界面。
+
+- 去重用的规范路径（file_intake.path_key()）在添加时算好并记住，删除时直接查表；
+- 多选整体移动与页面编排共用 composition.move_items()；
+- index() 查找位置用按需重建的 {路径: 序号} 字典，顺序变化前重复查找为 O(1)。
+"""
+import os
+
+from composition import move_items
+from file_intake import new_files, path_key
+
+
+def _stat_or_none(path):
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _sort_by_name(path):
+    return os.path.basename(path).lower(), path
+
+
+def _sort_by_date(path):
+    stat = _stat_or_none(path)
+    # 无法访问的文件排在最前（倒序时在最后）
+    return (stat is not None, stat.st_mtime_ns if stat else 0, _sort_by_name(path))
+
+
+def _sort_by_size(path):
+    stat = _stat_or_none(path)
+    return (stat is not None, stat.st_size if stat else 0, _sort_by_name(path))
+
+
+SORT_KEYS = {
+    'name': _sort_by_name,
+    'date': _sort_by_date,
+    'size': _sort_by_size,
+}
+
+
+class FileList:
+    """有序、不重复的文件路径列表"""
+
+    __slots__ = ('paths', 'keys', '_path_keys', '_positions')
+
+    def __init__(self, paths=()):
+        self.paths = []
+        self.keys = set()       # 已添加文件的规范路径
+        self._path_keys = {}    # 路径 -> 添加时算出的规范路径
+        self._positions = None
+        self.extend(paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __getitem__(self, index):
+        return self.paths[index]
+
+    def __contains__(self, path):
+        return path in self._position_map()
+
+    def _position_map(self):
+        if self._positions is None:
+            self._positions = {path: i for i, path in enumerate(self.paths)}
+        return self._positions
+
+    def index(self, path):
+        """path 的序号，不在列表中时抛出 ValueError"""
+        try:
+            return self._position_map()[path]
+        except KeyError:
+            raise ValueError(f"{path} 不在文件列表中")
+
+    def extend(self, paths, key=path_key):
+        """追加尚未添加的文件，返回实际添加的路径；key 同 file_intake.new_files()"""
+        added = new_files(paths, self.keys, key)
+        if added:
+            self._path_keys.update(added)
+            self.paths.extend(path for path, _ in added)
+            self._positions = None
+        return [path for path, _ in added]
+
+    def move(self, indices, target):
+        """把 indices 处的文件整体移到 target 之前，返回其新序号；见 move_items()"""
+        self.paths, moved = move_items(self.paths, indices, target)
+        self._positions = None
+        return moved
+
+    def remove(self, indices):
+        """删除 indices 处的文件，返回被删除的路径"""
+        selected = set(indices)
+        removed = [path for i, path in enumerate(self.paths) if i in selected]
+        self.paths = [path for i, path in enumerate(self.paths) if i not in selected]
+        for path in removed:
+            # 用添加时的规范路径：符号链接之后若被改指他处，重新计算会得到另一个值
+            self.keys.discard(self._path_keys.pop(path))
+        self._positions = None
+        return removed
+
+    def sort(self, by='name', reverse=False):
+        """按文件名（忽略大小写）、修改时间或大小排序；by 为 SORT_KEYS 中的键"""
+        self.paths.sort(key=SORT_KEYS[by], reverse=reverse)
+        self._positions = None
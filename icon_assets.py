@@ -0,0 +1,72 @@
+"""窗口图标资源
+
+启动时只加载预先生成的小尺寸图标，不再在运行时解码 icon.png 并写临时 ICO：
+
+- window_icon.ico：16~48 像素，供 Windows 的 iconbitmap 使用
+- window_icon.png：64 像素，供 iconphoto 使用（Tk 可直接读取 PNG）
+
+打包时由 pdf_merger.spec 调用 build_window_icons() 生成并随程序分发；
+开发环境中首次启动时在后台生成到缓存目录，之后直接加载。
+
+    python icon_assets.py icon.png 输出目录
+"""
+import os
+import sys
+
+WINDOW_ICON_ICO = 'window_icon.ico'
+WINDOW_ICON_PNG = 'window_icon.png'
+ICO_SIZES = [(16, 16), (24, 24), (32, 32), (48, 48)]
+PHOTO_SIZE = 64
+
+
+def icon_cache_dir():
+    """开发环境中生成的图标存放目录（与渲染缓存同级）"""
+    from preview_cache import default_cache_dir
+    return os.path.join(os.path.dirname(default_cache_dir()), 'icons')
+
+
+def find_window_icons(directory, source_png=None):
+    """返回 (ico 路径, png 路径)；文件不存在或比 source_png 旧时返回 None"""
+    ico_path = os.path.join(directory, WINDOW_ICON_ICO)
+    png_path = os.path.join(directory, WINDOW_ICON_PNG)
+    try:
+        built = min(os.path.getmtime(ico_path), os.path.getmtime(png_path))
+    except OSError:
+        return None
+    if source_png is not None:
+        try:
+            if os.path.getmtime(source_png) > built:
+                return None
+        except OSError:
+            pass
+    return ico_path, png_path
+
+
+def build_window_icons(source_png, directory):
+    """从 source_png 生成窗口图标，返回 (ico 路径, png 路径)"""
+    from PIL import Image
+
+    os.makedirs(directory, exist_ok=True)
+    ico_path = os.path.join(directory, WINDOW_ICON_ICO)
+    png_path = os.path.join(directory, WINDOW_ICON_PNG)
+    with Image.open(source_png) as img:
+        img = img.convert('RGBA')
+        photo = img.copy()
+        photo.thumbnail((PHOTO_SIZE, PHOTO_SIZE), Image.Resampling.LANCZOS)
+        # 先写临时文件再替换，并发启动的实例不会读到写了一半的图标
+        for path, image, options in (
+            (png_path, photo, {'format': 'PNG'}),
+            (ico_path, img, {'format': 'ICO', 'sizes': ICO_SIZES}),
+        ):
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            image.save(temp_path, **options)
+            os.replace(temp_path, path)
+    return ico_path, png_path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("用法: python icon_assets.py icon.png 输出目录", file=sys.stderr)
+        sys.exit(2)
+    for path in build_window_icons(sys.argv[1], sys.argv[2]):
+        print(path)
@@ -0,0 +1,224 @@
+"""增量重新合并
+
+合并后发现某页方向不对、旋转后再合并一次，是最常见的操作。IncrementalMerger
+记住上一次按页面组合（composition.Composition）合并的结果：输出路径、各页面
+对象在输出中的编号和偏移、源文件的大小与修改时间。下一次合并到同一路径时，
+如果只是旋转或顺序变化，就不再重新读取输入、重写整个文件，
+而是在原文件末尾追加一次 PDF 增量更新：
+
+- 旋转变化的页面：按原编号重写页面字典，只改 /Rotate；
+- 顺序变化：重写页面树根节点的 /Kids；
+- 新的交叉引用段通过 /Prev 指向上一次的交叉引用表。
+
+页面内容、字体、图像等已经序列化的对象全部原样复用，耗时只与改动的页面数有关。
+以下情况回退为完整合并：输出或任一源文件在此期间被修改、需要新页面、
+删除了页面、去重选项变化、开启了输出优化，或增量更新失败。
+删除页面必须重写：增量更新只能追加，被删页面的内容仍会留在文件中，
+截掉最后一次更新即可恢复，文件也不会变小。
+追加失败时把文件截断回原长度，不会留下不完整的更新。
+"""
+import os
+
+from PyPDF2.generic import IndirectObject, read_object
+
+from instrumentation import timed
+from merge_engine import MergeCancelled, MergeProgress, merge_composition
+from pdf_index import file_signature
+from stream_writer import CATALOG_ID, PAGES_ID, pages_tree_body, serialize_object
+
+
+class MergeRecord:
+    """上一次合并的记录
+
+    entries 为 [(源文件, 页码, 旋转, 页面对象编号)]，与输出中的页面顺序一致。
+    """
+
+    __slots__ = ('output_path', 'output_signature', 'sources', 'entries', 'dedup', 'layout')
+
+    def __init__(self, output_path, sources, entries, dedup, layout):
+        self.output_path = output_path
+        self.output_signature = file_signature(output_path)
+        self.sources = sources
+        self.entries = entries
+        self.dedup = dedup
+        self.layout = layout
+
+
+class IncrementalMerger:
+    """带增量更新的 merge_composition()，一个实例对应一个会话（例如一个界面窗口）"""
+
+    def __init__(self):
+        self.last = None
+
+    def forget(self):
+        """丢弃记录，下一次总是完整合并"""
+        self.last = None
+
+    def merge(self, composition, output_path, progress_callback=None, dedup=False,
+              workers=1, cancel_event=None, optimize=None):
+        """参数与返回值同 merge_composition()
+
+        能增量更新时直接改写上一次的输出，返回值的 incremental 为 True，
+        patched_objects 为改写的对象数。
+        """
+        output_path = os.path.abspath(output_path)
+        plan = None if optimize is not None else self.plan(composition, output_path, dedup)
+        if plan is not None:
+            if cancel_event is not None and cancel_event.is_set():
+                raise MergeCancelled("合并已取消")
+            try:
+                progress = self._apply(plan, composition)
+            except Exception:
+                # 记录与文件对不上或追加失败（文件已截断回原样），改为完整合并
+                self.last = None
+            else:
+                if progress_callback is not None:
+                    progress_callback(progress)
+                return progress
+
+        self.last = None
+        progress = merge_composition(
+            composition, output_path, progress_callback, dedup, workers, cancel_event, optimize
+        )
+        if progress.layout is not None:
+            sources = composition.sources()
+            entries = [
+                (entry.source, entry.page, entry.rotation, page_id)
+                for entry, page_id in zip(composition, progress.layout.page_ids)
+            ]
+            self.last = MergeRecord(
+                output_path,
+                {source: file_signature(source) for source in sources},
+                entries, dedup, progress.layout
+            )
+        return progress
+
+    def plan(self, composition, output_path, dedup):
+        """能增量更新时返回 [(条目, 页面对象编号, 原旋转)]，否则返回 None"""
+        last = self.last
+        if last is None or last.output_path != output_path or last.dedup != dedup:
+            return None
+        try:
+            if file_signature(output_path) != last.output_signature:
+                return None
+            for source in composition.sources():
+                if last.sources.get(source) != file_signature(source):
+                    return None
+        except OSError:
+            return None
+
+        available = {}
+        for source, page, rotation, page_id in last.entries:
+            available.setdefault((source, page), []).append((rotation, page_id))
+        plan = []
+        for entry in composition:
+            candidates = available.get((entry.source, entry.page))
+            if not candidates:
+                return None  # 需要输出中还没有的页面
+            # 同一页出现多次时优先复用旋转相同的页面对象，减少改写
+            index = next(
+                (i for i, (rotation, _) in enumerate(candidates) if rotation == entry.rotation), 0
+            )
+            rotation, page_id = candidates.pop(index)
+            plan.append((entry, page_id, rotation))
+        if any(available.values()):
+            return None  # 删除了页面：被删页面的内容不能留在输出中
+        return plan or None
+
+    def _apply(self, plan, composition):
+        last = self.last
+        layout = last.layout
+        objects = []
+        with timed('write', step='incremental', path=last.output_path):
+            with open(last.output_path, 'rb') as f:
+                for entry, page_id, old_rotation in plan:
+                    if (entry.rotation - old_rotation) % 360:
+                        page = _read_object_at(f, layout.page_offsets[page_id])
+                        rotate = (_rotate_value(page) - old_rotation + entry.rotation) % 360
+                        objects.append((page_id, serialize_object(
+                            page, {'/Rotate': str(rotate).encode('ascii')}
+                        )))
+            page_ids = [page_id for _, page_id, _ in plan]
+            if page_ids != layout.page_ids:
+                objects.append((PAGES_ID, pages_tree_body(page_ids)))
+            if objects:
+                offsets, xref_offset = _append_update(
+                    last.output_path, objects, layout.size, layout.xref_offset
+                )
+                layout.page_offsets.update(
+                    (obj_id, offset) for obj_id, offset in offsets.items() if obj_id != PAGES_ID
+                )
+                layout.xref_offset = xref_offset
+                last.output_signature = file_signature(last.output_path)
+
+        layout.page_ids = page_ids
+        last.entries = [
+            (entry.source, entry.page, entry.rotation, page_id) for entry, page_id, _ in plan
+        ]
+
+        sources = composition.sources()
+        progress = MergeProgress(len(sources), 0)
+        progress.files_done = len(sources)
+        progress.pages_done = len(plan)
+        progress.stage = 'done'
+        progress.layout = layout
+        progress.incremental = True
+        progress.patched_objects = len(objects)
+        return progress
+
+
+def _read_object_at(f, offset):
+    """读取 offset 处的 "编号 0 obj" 对象；引用不解析，只保留编号"""
+    f.seek(offset)
+    f.readline()
+    return read_object(f, None)
+
+
+def _rotate_value(page):
+    rotate = dict.get(page, '/Rotate', 0)
+    if isinstance(rotate, IndirectObject):
+        raise ValueError("页面的 /Rotate 为间接对象")
+    return int(rotate)
+
+
+def _append_update(path, objects, size, prev_xref):
+    """在文件末尾追加 objects（[(编号, 内容)]）及其交叉引用段
+
+    返回 ({编号: 偏移}, 新交叉引用表偏移)。失败时把文件截断回原长度。
+    """
+    with open(path, 'r+b') as f:
+        end = f.seek(0, os.SEEK_END)
+        try:
+            chunks = []
+            offsets = {}
+            position = end
+            for obj_id, body in objects:
+                chunk = b"%d 0 obj\n" % obj_id + body + b"\nendobj\n"
+                offsets[obj_id] = position
+                position += len(chunk)
+                chunks.append(chunk)
+
+            # 按连续编号分段：每段为 "起始编号 个数" 加对应的条目；
+            # 照惯例先写对象 0 的空闲条目，部分阅读器以此判断编号是否从 0 开始
+            ids = sorted(offsets)
+            lines = [b"xref\n0 1\n0000000000 65535 f \n"]
+            start = 0
+            while start < len(ids):
+                stop = start + 1
+                while stop < len(ids) and ids[stop] == ids[stop - 1] + 1:
+                    stop += 1
+                lines.append(b"%d %d\n" % (ids[start], stop - start))
+                lines.extend(b"%010d 00000 n \n" % offsets[i] for i in ids[start:stop])
+                start = stop
+            chunks.extend(lines)
+            chunks.append(
+                f"trailer\n<< /Size {size} /Root {CATALOG_ID} 0 R /Prev {prev_xref} >>\n"
+                f"startxref\n{position}\n%%EOF\n".encode('ascii')
+            )
+            f.write(b''.join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.truncate(end)
+            raise
+    return offsets, position
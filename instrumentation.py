@@ -0,0 +1,184 @@
+"""阶段计时
+
+记录渲染与合并热路径上各阶段的耗时：
+
+- spawn: 启动 pdftoppm 进程        - render: 渲染页面
+- decode: 解码像素                  - resize / rotate: 生成显示图像
+- photo: 创建 Tk PhotoImage        - parse: PdfReader 解析输入
+- serialize: 序列化页面对象         - write: 写出合并结果
+- optimize: 输出优化（压缩流、图像降采样）
+
+默认关闭，此时 timed() 返回共享的空上下文，开销只有一次全局变量判断。
+设置环境变量 PDFMERGER_TIMING=1 即开启；值为文件路径时同时以 JSON Lines
+写入该文件（按大小轮转）。界面中按 F12 打开调试面板也会开启计时。
+
+进程池（merge -j）中的子进程只在设置了环境变量时计时，且写入各自的统计。
+"""
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+
+STAGES = ('spawn', 'render', 'decode', 'resize', 'rotate', 'photo',
+          'parse', 'serialize', 'write', 'optimize')
+
+_enabled = False
+_lock = threading.Lock()
+_stats = {}                   # 阶段 -> [次数, 总耗时, 最大耗时, 最近一次]
+_recent = deque(maxlen=200)   # 最近的事件，供调试面板查看
+_caches = {}                  # 名称 -> 带 stats() 方法的缓存
+_logger = None
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('stage', 'fields', 'start')
+
+    def __init__(self, stage, fields):
+        self.stage = stage
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        fields = self.fields
+        if exc_type is not None:
+            fields = dict(fields, error=exc_type.__name__)
+        record(self.stage, time.perf_counter() - self.start, **fields)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def enable(log_path=None, max_bytes=5 * 1024 * 1024, backups=3):
+    """开启计时；log_path 不为 None 时把每个事件以 JSON 行写入轮转日志"""
+    global _enabled, _logger
+    if log_path and _logger is None:
+        logger = logging.getLogger('pdfmerger.timing')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        _logger = logger
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def timed(stage, **fields):
+    """计时上下文：with timed('render', page=3): ..."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(stage, fields)
+
+
+def record(stage, seconds, **fields):
+    """记录一次耗时（秒）"""
+    if not _enabled:
+        return
+    event = {'ts': round(time.time(), 3), 'stage': stage, 'ms': round(seconds * 1000, 3)}
+    event.update(fields)
+    with _lock:
+        entry = _stats.get(stage)
+        if entry is None:
+            entry = _stats[stage] = [0, 0.0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        entry[3] = seconds
+        _recent.append(event)
+    if _logger is not None:
+        _logger.info(json.dumps(event, ensure_ascii=False, default=str))
+
+
+def event(name, **fields):
+    """记录一次非计时事件（例如预览失败），只写入最近事件和日志"""
+    if not _enabled:
+        return
+    entry = {'ts': round(time.time(), 3), 'event': name}
+    entry.update(fields)
+    with _lock:
+        _recent.append(entry)
+    if _logger is not None:
+        _logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+
+def register_cache(name, cache):
+    """登记一个缓存，snapshot() 中会带上它的命中率"""
+    _caches[name] = cache
+
+
+def snapshot():
+    """各阶段的次数、平均/最大/最近耗时（毫秒）及已登记缓存的统计"""
+    with _lock:
+        stages = {
+            stage: {
+                'count': count,
+                'avg_ms': round(total / count * 1000, 2),
+                'max_ms': round(maximum * 1000, 2),
+                'last_ms': round(last * 1000, 2),
+            }
+            for stage, (count, total, maximum, last) in _stats.items()
+        }
+        recent = list(_recent)
+    return {
+        'stages': stages,
+        'caches': {name: cache.stats() for name, cache in _caches.items()},
+        'recent': recent,
+    }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _recent.clear()
+
+
+def format_overlay():
+    """调试面板显示的文本"""
+    data = snapshot()
+    lines = []
+    for stage in STAGES:
+        stats = data['stages'].get(stage)
+        if stats is not None:
+            lines.append(f"{stage:<9} n={stats['count']:<5} avg {stats['avg_ms']:>7.1f} ms"
+                         f"  max {stats['max_ms']:>7.1f}  last {stats['last_ms']:>7.1f}")
+    for name, stats in data['caches'].items():
+        lines.append(f"{name:<9} 命中率 {stats['hit_rate']:.0%}  "
+                     f"{stats['hits']}/{stats['hits'] + stats['misses']}  "
+                     f"{stats['bytes'] / 1048576:.1f} MB")
+    return '\n'.join(lines) or "暂无数据"
+
+
+def _configure_from_environment():
+    value = os.environ.get('PDFMERGER_TIMING', '').strip()
+    if value and value != '0':
+        enable(None if value == '1' else value)
+
+
+_configure_from_environment()
@@ -0,0 +1,483 @@
+"""PDF 合并引擎
+
+与界面无关的合并逻辑，GUI 和命令行/批处理任务共用同一条代码路径。
+进度通过回调函数汇报，不依赖 Tk、filedialog 或 messagebox。
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+from PyPDF2 import PdfWriter
+
+from composition import parse_composition
+from instrumentation import timed
+from optimize import OptimizeOptions, optimize_pdf
+from pdf_source import mapped_reader, open_pdf_reader
+from process_pool import imap_ordered
+from stream_writer import StreamingPdfWriter, build_fragment
+
+
+class MergeCancelled(Exception):
+    """合并被用户取消"""
+
+
+class MergeProgress:
+    """合并进度快照，每次回调时传给 progress_callback"""
+
+    def __init__(self, files_total, bytes_total):
+        self.files_total = files_total
+        self.files_done = 0
+        self.bytes_total = bytes_total
+        self.bytes_done = 0
+        self.pages_done = 0
+        self.current_file = None
+        # read: 读取输入 / write: 写出结果 / optimize: 优化输出 / done: 完成
+        self.stage = 'read'
+        self.dedup_objects = 0       # 去重合并掉的对象数
+        self.dedup_bytes_saved = 0   # 去重节省的字节数
+        self.optimize = None         # 开启输出优化时为 OptimizeResult
+        self.layout = None           # 流式写出时为输出的 OutputLayout
+        self.incremental = False     # 是否以增量更新完成（见 incremental.py）
+        self.patched_objects = 0     # 增量更新改写的对象数
+
+    @property
+    def fraction(self):
+        """按字节估算的完成比例（0~1）"""
+        if self.bytes_total <= 0:
+            return 1.0 if self.stage == 'done' else 0.0
+        return min(self.bytes_done / self.bytes_total, 1.0)
+
+
+def _input_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def open_reader(pdf_file):
+    """打开 PDF；加密但无打开密码的文件用空密码解密"""
+    with timed('parse', path=pdf_file):
+        pdf_reader = open_pdf_reader(pdf_file)
+        if pdf_reader.is_encrypted:
+            pdf_reader.decrypt('')
+    return pdf_reader
+
+
+def count_pages(pdf_file):
+    """页数；读完立即解除映射、关闭文件"""
+    with timed('parse', path=pdf_file), mapped_reader(pdf_file) as pdf_reader:
+        if pdf_reader.is_encrypted:
+            pdf_reader.decrypt('')
+        return len(pdf_reader.pages)
+
+
+def merge_files(inputs, output_path, rotations=None, progress_callback=None,
+                streaming=False, dedup=False, workers=1, cancel_event=None,
+                optimize=None):
+    """按顺序合并 inputs 中的 PDF 文件并写入 output_path
+
+    rotations 的结构与 PDFMergerApp.file_rotations 相同：
+    {文件路径: {页码(从0开始): 顺时针角度}}。
+    progress_callback(progress) 在每个文件读完以及写出前后被调用。
+    streaming=True 时每读完一个文件就把它写入输出，峰值内存只取决于
+    最大的单个输入，适合合并超大文件。
+    dedup=True 时对内容相同的对象（字体、图像、ICC 配置等）只保留一份，
+    去重在流式写出过程中完成，因此总是使用流式模式。
+    workers > 1 时在进程池中并行解析和序列化各输入文件，再按原顺序写出，
+    输出与串行结果逐字节相同（同样使用流式模式）。
+    cancel_event（threading.Event）被设置后在下一个检查点抛出 MergeCancelled。
+    optimize 为 OptimizeOptions 时合并后再做一遍输出优化（压缩流、图像降采样、
+    对象流），结果记录在返回值的 optimize 属性中，见 optimize.optimize_pdf()。
+    结果先写入同目录下的临时文件，成功后原子地重命名为 output_path；
+    失败或取消时删除临时文件，不会留下不完整的输出。
+    返回最终的 MergeProgress，其中包含总页数和去重节省的字节数。
+    """
+    inputs = list(inputs)
+    if not inputs:
+        raise ValueError("没有输入文件")
+    rotations = rotations or {}
+
+    progress = MergeProgress(len(inputs), sum(_input_size(p) for p in inputs))
+
+    def check_cancel():
+        if cancel_event is not None and cancel_event.is_set():
+            raise MergeCancelled("合并已取消")
+
+    def report():
+        if progress_callback is not None:
+            progress_callback(progress)
+        check_cancel()
+
+    with atomic_output(output_path) as temp_path, \
+            _optimized_output(temp_path, optimize, progress, report, check_cancel) as merge_path:
+        if streaming or dedup or workers > 1:
+            _merge_streaming(inputs, merge_path, rotations, progress, report, dedup, workers)
+        else:
+            _merge_in_memory(inputs, merge_path, rotations, progress, report, check_cancel)
+
+    progress.stage = 'done'
+    report()
+    return progress
+
+
+@contextmanager
+def atomic_output(output_path):
+    """提供一个临时输出路径，正常结束后原子地替换 output_path"""
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(output_path)}.", suffix='.tmp', dir=directory
+    )
+    os.close(fd)
+    # mkstemp 创建的文件仅所有者可读写，改为与普通新建文件相同的权限
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(temp_path, 0o666 & ~umask)
+    try:
+        yield temp_path
+        os.replace(temp_path, output_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def _optimized_output(output_path, options, progress, report, check_cancel):
+    """提供合并结果的写入路径；options 不为 None 时先写入中间文件，再优化到 output_path"""
+    if options is None:
+        yield output_path
+        return
+    merged_path = output_path + '.merged'
+    try:
+        yield merged_path
+        progress.stage = 'optimize'
+        report()
+        progress.optimize = optimize_pdf(merged_path, output_path, options, check_cancel)
+        # 优化后的文件结构与合并结果不同，不能用于增量更新
+        progress.layout = None
+    finally:
+        try:
+            os.remove(merged_path)
+        except OSError:
+            pass
+
+
+def _merge_in_memory(inputs, output_path, rotations, progress, report, check_cancel):
+    pdf_writer = PdfWriter()
+    readers = []
+    for pdf_file in inputs:
+        progress.current_file = pdf_file
+        with timed('parse', path=pdf_file):
+            pdf_reader = open_pdf_reader(pdf_file)
+        readers.append(pdf_reader)
+        page_rotations = rotations.get(pdf_file, {})
+
+        for page_num, page in enumerate(pdf_reader.pages):
+            # 获取该页的旋转角度（如果有）
+            rotation = page_rotations.get(page_num, 0)
+            if rotation:
+                page.rotate(rotation)
+            pdf_writer.add_page(page)
+            progress.pages_done += 1
+            check_cancel()
+
+        progress.files_done += 1
+        progress.bytes_done += _input_size(pdf_file)
+        report()
+
+    progress.stage = 'write'
+    report()
+    try:
+        with timed('write', pages=progress.pages_done), open(output_path, 'wb') as output_file:
+            pdf_writer.write(output_file)
+    finally:
+        # 写出时才从各输入读取页面内容，之后立即解除映射
+        for pdf_reader in readers:
+            pdf_reader.stream.close()
+
+
+def ingest_file(pdf_file, page_rotations, selection=None):
+    """解析并校验单个输入，返回可重定位的 DocumentFragment（可在子进程中运行）
+
+    selection 为 [(页码, 旋转), ...] 时只取这些页面，见 build_fragment()。
+    """
+    try:
+        pdf_reader = open_reader(pdf_file)
+        try:
+            with timed('serialize', path=pdf_file):
+                return build_fragment(pdf_reader, page_rotations, selection)
+        finally:
+            # 片段中保存的是数据副本，序列化完成后即可解除映射
+            pdf_reader.stream.close()
+    except Exception as e:
+        raise ValueError(f"{os.path.basename(pdf_file)}: {e}") from e
+
+
+def iter_fragments(inputs, rotations, workers=1):
+    """按输入顺序逐个产出 (文件路径, DocumentFragment)"""
+    return _iter_tasks(
+        [(pdf_file, rotations.get(pdf_file, {}), None) for pdf_file in inputs], workers
+    )
+
+
+def _iter_tasks(tasks, workers=1):
+    """tasks 为 [(文件路径, 旋转, 页面选择)]，按顺序逐个产出 (文件路径, DocumentFragment)
+
+    workers > 1 时通过 process_pool.imap_ordered() 在进程池中执行。
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield task[0], ingest_file(*task)
+            # PdfReader 与其页面对象互相引用，需要显式回收，
+            # 否则多个已处理的输入会同时留在内存中
+            gc.collect()
+        return
+
+    for task, fragment in imap_ordered(_ingest_task, tasks, workers):
+        yield task[0], fragment
+
+
+def _ingest_task(task):
+    """工作进程：ingest_file() 的单参数形式"""
+    return ingest_file(*task)
+
+
+def _merge_streaming(inputs, output_path, rotations, progress, report, dedup=False,
+                     workers=1):
+    tasks = [(pdf_file, rotations.get(pdf_file, {}), None) for pdf_file in inputs]
+    _write_streaming(tasks, output_path, progress, report, dedup, workers)
+
+
+def _write_streaming(tasks, output_path, progress, report, dedup=False, workers=1,
+                     positions=None):
+    """按 tasks 顺序写出各输入的片段
+
+    positions 与 tasks 一一对应，给出每个任务各页在输出中的位置；
+    为 None 时页面按写出顺序排列。
+    """
+    with open(output_path, 'wb') as output_file:
+        writer = StreamingPdfWriter(output_file, dedup=dedup)
+        page_ids = None if positions is None else [None] * sum(map(len, positions))
+        for task_no, (pdf_file, fragment) in enumerate(_iter_tasks(tasks, workers)):
+            progress.current_file = pdf_file
+            first = len(writer.page_ids)
+            with timed('write', path=pdf_file):
+                progress.pages_done += writer.add_fragment(fragment)
+            del fragment
+            if page_ids is not None:
+                for position, page_id in zip(positions[task_no], writer.page_ids[first:]):
+                    page_ids[position] = page_id
+
+            progress.files_done += 1
+            progress.bytes_done += _input_size(pdf_file)
+            progress.dedup_objects = writer.dedup_objects
+            progress.dedup_bytes_saved = writer.dedup_bytes_saved
+            report()
+
+        if page_ids is not None:
+            # 对象按源文件写出，页面树中的顺序由组合决定
+            writer.page_ids = page_ids
+        progress.stage = 'write'
+        report()
+        with timed('write', step='close'):
+            writer.close()
+        progress.layout = writer.layout()
+
+
+def merge_composition(composition, output_path, progress_callback=None, dedup=False,
+                      workers=1, cancel_event=None, optimize=None):
+    """按页面组合（composition.Composition）合并
+
+    每个源文件只打开一次：同一文件的所有选中页面一起序列化写出，
+    最后按组合中的顺序排列页面树，同一页可以出现多次。
+    其余参数与返回值同 merge_files()，总是使用流式写出。
+    """
+    groups = composition.selections()
+    if not groups:
+        raise ValueError("没有要合并的页面")
+
+    progress = MergeProgress(len(groups), sum(_input_size(p) for p in groups))
+
+    def check_cancel():
+        if cancel_event is not None and cancel_event.is_set():
+            raise MergeCancelled("合并已取消")
+
+    def report():
+        if progress_callback is not None:
+            progress_callback(progress)
+        check_cancel()
+
+    tasks = []
+    positions = []
+    for pdf_file, selected in groups.items():
+        tasks.append((pdf_file, None, [(page, rotation) for _, page, rotation in selected]))
+        positions.append([position for position, _, _ in selected])
+
+    with atomic_output(output_path) as temp_path, \
+            _optimized_output(temp_path, optimize, progress, report, check_cancel) as merge_path:
+        _write_streaming(tasks, merge_path, progress, report, dedup, workers, positions)
+
+    progress.stage = 'done'
+    report()
+    return progress
+
+
+def format_size(nbytes):
+    """将字节数格式化为便于阅读的字符串"""
+    if nbytes < 1024:
+        return f"{nbytes} B"
+    for unit in ('KB', 'MB', 'GB'):
+        nbytes /= 1024
+        if nbytes < 1024 or unit == 'GB':
+            return f"{nbytes:.1f} {unit}"
+
+
+def format_optimize_result(result):
+    """输出优化结果的简短说明"""
+    saved = result.bytes_saved
+    ratio = saved / result.bytes_before if result.bytes_before else 0.0
+    text = (f"{format_size(result.bytes_before)} → {format_size(result.bytes_after)}，"
+            f"节省 {format_size(max(saved, 0))}（{ratio:.0%}），用时 {result.seconds:.1f} 秒")
+    if result.images_recompressed:
+        text += f"，重新编码 {result.images_recompressed} 张图像"
+    return text
+
+
+def parse_rotation(spec, inputs):
+    """解析命令行旋转参数 "文件序号:页码:角度"（序号和页码均从1开始）"""
+    try:
+        file_no, page_no, angle = (int(part) for part in spec.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的旋转参数: {spec}")
+    if not 1 <= file_no <= len(inputs) or page_no < 1:
+        raise argparse.ArgumentTypeError(f"旋转参数超出范围: {spec}")
+    if angle % 90:
+        raise argparse.ArgumentTypeError(f"旋转角度必须是90的倍数: {spec}")
+    return inputs[file_no - 1], page_no - 1, angle % 360
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="按顺序合并多个PDF文件（无界面模式）"
+    )
+    parser.add_argument('inputs', nargs='+', help="输入PDF文件，按合并顺序排列")
+    parser.add_argument('-o', '--output', required=True, help="输出PDF文件路径")
+    parser.add_argument(
+        '-r', '--rotate', action='append', default=[], metavar='文件:页:角度',
+        help="旋转指定页，例如 2:5:90 表示第2个文件的第5页顺时针旋转90度，可重复"
+    )
+    parser.add_argument(
+        '-p', '--pages', action='append', default=[], metavar='文件[:页码范围]',
+        help="按页面组合输出，例如 -p 1:3-40 -p 2 -p 1:1 表示第1个文件的第3-40页、"
+             "第2个文件全部、再接第1个文件的第1页，可重复；-r 同样作用于这些页面"
+    )
+    parser.add_argument(
+        '--streaming', action='store_true',
+        help="流式写出：逐个文件写入输出，内存占用只取决于最大的单个输入"
+    )
+    parser.add_argument(
+        '--dedup', action='store_true',
+        help="合并内容相同的字体、图像等共享资源（隐含 --streaming）"
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1, metavar='N',
+        help="并行解析输入文件的进程数（隐含 --streaming），输出与串行完全相同"
+    )
+    parser.add_argument(
+        '--optimize', action='store_true',
+        help="优化输出：压缩未压缩的流并使用对象流，报告节省的大小和用时"
+    )
+    parser.add_argument(
+        '--image-dpi', type=int, metavar='DPI',
+        help="把分辨率高于 DPI 的图像降采样到该分辨率（隐含 --optimize）"
+    )
+    parser.add_argument(
+        '--jpeg-quality', type=int, default=75, metavar='Q',
+        help="降采样后 JPEG 图像的编码质量（1-95，默认 75）"
+    )
+    parser.add_argument('-q', '--quiet', action='store_true', help="不输出进度")
+    return parser
+
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+
+    rotations = {}
+    for spec in args.rotate:
+        try:
+            pdf_file, page_num, angle = parse_rotation(spec, args.inputs)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        rotations.setdefault(pdf_file, {})[page_num] = angle
+    if args.image_dpi is not None and args.image_dpi <= 0:
+        parser.error("--image-dpi 必须为正数")
+    if not 1 <= args.jpeg_quality <= 95:
+        parser.error("--jpeg-quality 必须在 1-95 之间")
+
+    optimize = None
+    if args.optimize or args.image_dpi:
+        optimize = OptimizeOptions(
+            image_dpi=args.image_dpi, jpeg_quality=args.jpeg_quality, workers=args.jobs
+        )
+
+    def print_progress(progress):
+        if progress.stage == 'read':
+            print(f"[{progress.files_done}/{progress.files_total}] "
+                  f"{os.path.basename(progress.current_file)}，"
+                  f"累计 {progress.pages_done} 页", file=sys.stderr)
+        elif progress.stage == 'write':
+            print(f"正在写入 {args.output} ...", file=sys.stderr)
+        elif progress.stage == 'optimize':
+            print("正在优化输出 ...", file=sys.stderr)
+
+    try:
+        if args.pages:
+            composition = parse_composition(
+                args.pages, args.inputs, count_pages
+            )
+            for entry in composition:
+                entry.rotation = rotations.get(entry.source, {}).get(entry.page, 0)
+            result = merge_composition(
+                composition,
+                args.output,
+                progress_callback=None if args.quiet else print_progress,
+                dedup=args.dedup,
+                workers=args.jobs,
+                optimize=optimize
+            )
+        else:
+            result = merge_files(
+                args.inputs,
+                args.output,
+                rotations=rotations,
+                progress_callback=None if args.quiet else print_progress,
+                streaming=args.streaming,
+                dedup=args.dedup,
+                workers=args.jobs,
+                optimize=optimize
+            )
+    except Exception as e:
+        print(f"合并失败: {e}", file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        print(f"完成：共 {result.pages_done} 页 -> {args.output}", file=sys.stderr)
+        if args.dedup:
+            print(f"去重：合并 {result.dedup_objects} 个重复对象，"
+                  f"节省 {format_size(result.dedup_bytes_saved)}", file=sys.stderr)
+        if result.optimize is not None:
+            print(f"优化：{format_optimize_result(result.optimize)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
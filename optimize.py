@@ -0,0 +1,255 @@
+"""合并结果的输出优化
+
+在合并完成后对输出文件做一遍重写：
+
+1. 未压缩的流（内容流、字体、未编码的图像等）用 Flate 无损压缩；
+2. 可选：有效分辨率高于 image_dpi 的图像降采样到该分辨率，
+   JPEG 图像按 jpeg_quality 重新编码，其余图像仍用 Flate 保存；
+   图像的解码、缩放和编码在 Pillow 进程池中并行完成；
+3. 非流对象打包进压缩的对象流，交叉引用写为交叉引用流。
+
+图像的有效分辨率按引用它的最大页面的长边估算：图像最多铺满整页，
+因此实际显示的分辨率不会低于估算值，降采样后不会低于目标分辨率。
+只处理 8 位灰度/RGB 图像；蒙版、CMYK、索引色、JBIG2/JPX/CCITT 等图像保持不变。
+重新编码后没有变小的流保留原样。
+"""
+import io
+import os
+import time
+import zlib
+
+from instrumentation import timed
+from process_pool import imap_ordered
+
+# 缩放比例高于此值时不值得降采样
+MIN_SCALE_GAIN = 0.9
+
+_COMPONENTS = {'/DeviceGray': 1, '/CalGray': 1, '/DeviceRGB': 3, '/CalRGB': 3}
+_PIL_MODES = {1: 'L', 3: 'RGB'}
+
+
+class OptimizeOptions:
+    """优化选项；image_dpi 为 None 时不处理图像"""
+
+    __slots__ = ('image_dpi', 'jpeg_quality', 'object_streams', 'workers')
+
+    def __init__(self, image_dpi=None, jpeg_quality=75, object_streams=True, workers=1):
+        self.image_dpi = image_dpi
+        self.jpeg_quality = jpeg_quality
+        self.object_streams = object_streams
+        self.workers = workers
+
+
+class OptimizeResult:
+    """优化结果：前后大小（字节）、耗时（秒）和处理的对象数"""
+
+    __slots__ = ('bytes_before', 'bytes_after', 'seconds',
+                 'streams_compressed', 'images_recompressed')
+
+    def __init__(self, bytes_before):
+        self.bytes_before = bytes_before
+        self.bytes_after = bytes_before
+        self.seconds = 0.0
+        self.streams_compressed = 0
+        self.images_recompressed = 0
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_before - self.bytes_after
+
+
+def optimize_pdf(input_path, output_path, options=None, check_cancel=None):
+    """读取 input_path，按 options 优化后写入 output_path，返回 OptimizeResult
+
+    check_cancel 为可调用对象时在处理过程中定期调用，可抛出异常中止。
+    """
+    from pdf_source import mapped_reader
+    from stream_writer import StreamingPdfWriter, build_fragment
+
+    options = options or OptimizeOptions()
+    check_cancel = check_cancel or (lambda: None)
+    start = time.perf_counter()
+    result = OptimizeResult(os.path.getsize(input_path))
+
+    with mapped_reader(input_path) as reader:
+        if options.image_dpi:
+            with timed('optimize', step='images'):
+                result.images_recompressed = _recompress_images(reader, options, check_cancel)
+        check_cancel()
+        with timed('optimize', step='streams'):
+            result.streams_compressed = _compress_streams(reader)
+        check_cancel()
+
+        with timed('write', path=output_path, source='optimize'), open(output_path, 'wb') as f:
+            writer = StreamingPdfWriter(f, object_streams=options.object_streams)
+            writer.add_fragment(build_fragment(reader))
+            writer.close()
+
+    result.bytes_after = os.path.getsize(output_path)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def _iter_streams(reader):
+    """逐个产出文件中的所有流对象（对象流中不会有流对象，无需遍历）"""
+    from PyPDF2.generic import IndirectObject, StreamObject
+
+    for generation, entries in reader.xref.items():
+        for idnum in entries:
+            obj = reader.get_object(IndirectObject(idnum, generation, reader))
+            if isinstance(obj, StreamObject):
+                yield obj
+
+
+def _compress_streams(reader):
+    """把没有 /Filter 的流改为 Flate 压缩，返回压缩的个数"""
+    from PyPDF2.generic import NameObject
+
+    count = 0
+    for obj in _iter_streams(reader):
+        if '/Filter' in obj:
+            continue
+        data = obj._data
+        compressed = zlib.compress(data)
+        if len(compressed) >= len(data):
+            continue
+        obj._data = compressed
+        obj[NameObject('/Filter')] = NameObject('/FlateDecode')
+        obj.pop('/DecodeParms', None)
+        count += 1
+    return count
+
+
+def _image_extents(reader):
+    """图像对象 (编号, 代数) -> 引用它的最大页面长边（磅）"""
+    from PyPDF2.generic import IndirectObject
+
+    extents = {}
+    for page in reader.pages:
+        box = page.mediabox
+        extent = max(float(box.width), float(box.height))
+        pending = [page.get('/Resources')]
+        visited = set()
+        while pending:
+            resources = pending.pop()
+            if isinstance(resources, IndirectObject):
+                resources = resources.get_object()
+            if not resources:
+                continue
+            xobjects = resources.get('/XObject')
+            if isinstance(xobjects, IndirectObject):
+                xobjects = xobjects.get_object()
+            for ref in (xobjects or {}).values():
+                if not isinstance(ref, IndirectObject):
+                    continue
+                key = (ref.idnum, ref.generation)
+                xobject = ref.get_object()
+                subtype = xobject.get('/Subtype')
+                if subtype == '/Image':
+                    extents[key] = max(extents.get(key, 0.0), extent)
+                elif subtype == '/Form' and key not in visited:
+                    # 表单对象中的图像按所在页面估算
+                    visited.add(key)
+                    pending.append(xobject.get('/Resources'))
+    return extents
+
+
+def _image_task(reader, key, extent, options):
+    """为需要降采样的图像生成工作进程的任务；不需要或不支持时返回 None"""
+    from PyPDF2.generic import IndirectObject
+
+    obj = reader.get_object(IndirectObject(key[0], key[1], reader))
+    if obj.get('/ImageMask') or '/Decode' in obj or obj.get('/BitsPerComponent') != 8:
+        return None
+    color_space = obj.get('/ColorSpace')
+    if isinstance(color_space, IndirectObject):
+        color_space = color_space.get_object()
+    if isinstance(color_space, list):
+        # ICCBased 按其分量数处理，色彩空间本身保持不变
+        profile = color_space[1].get_object() if len(color_space) > 1 else None
+        components = profile.get('/N') if color_space[0] == '/ICCBased' and profile else None
+    else:
+        components = _COMPONENTS.get(color_space)
+    if components not in _PIL_MODES:
+        return None
+
+    filters = obj.get('/Filter')
+    if isinstance(filters, list):
+        filters = filters[0] if len(filters) == 1 else None
+    if filters not in (None, '/FlateDecode', '/DCTDecode'):
+        return None
+    params = obj.get('/DecodeParms')
+    if isinstance(params, IndirectObject):
+        params = params.get_object()
+    if params and (not isinstance(params, dict) or params.get('/Predictor', 1) > 1):
+        return None
+
+    width, height = int(obj['/Width']), int(obj['/Height'])
+    scale = extent / 72 * options.image_dpi / max(width, height)
+    if scale > MIN_SCALE_GAIN:
+        return None
+    size = (max(round(width * scale), 1), max(round(height * scale), 1))
+    return (key, obj._data, filters, (width, height), _PIL_MODES[components], size,
+            options.jpeg_quality)
+
+
+def resample_image(task):
+    """工作进程：解码、缩放并重新编码一张图像
+
+    返回 (对象键, 新数据, 新滤镜, 新尺寸)，失败时新数据为 None。
+    """
+    from PIL import Image
+
+    key, data, filters, (width, height), mode, size, quality = task
+    try:
+        if filters == '/DCTDecode':
+            img = Image.open(io.BytesIO(data))
+            img.draft(mode, size)
+            img = img.convert(mode)
+        else:
+            if filters == '/FlateDecode':
+                data = zlib.decompress(data)
+            img = Image.frombytes(mode, (width, height), data)
+        img = img.resize(size, Image.Resampling.LANCZOS)
+        if filters == '/DCTDecode':
+            out = io.BytesIO()
+            img.save(out, format='JPEG', quality=quality, optimize=True)
+            return key, out.getvalue(), '/DCTDecode', size
+        return key, zlib.compress(img.tobytes()), '/FlateDecode', size
+    except Exception:
+        return key, None, None, None
+
+
+def _iter_results(tasks, workers):
+    """按任务顺序产出 resample_image() 的结果；workers > 1 时使用进程池"""
+    if workers <= 1:
+        for task in tasks:
+            yield resample_image(task)
+        return
+
+    for _, result in imap_ordered(resample_image, tasks, workers):
+        yield result
+
+
+def _recompress_images(reader, options, check_cancel):
+    """降采样分辨率过高的图像，返回替换的图像数"""
+    from PyPDF2.generic import IndirectObject, NameObject, NumberObject
+
+    tasks = (
+        _image_task(reader, key, extent, options)
+        for key, extent in _image_extents(reader).items()
+    )
+    count = 0
+    for key, data, filters, size in _iter_results(
+            (task for task in tasks if task is not None), options.workers):
+        check_cancel()
+        obj = reader.get_object(IndirectObject(key[0], key[1], reader))
+        if data is None or len(data) >= len(obj._data):
+            continue
+        obj._data = data
+        obj[NameObject('/Filter')] = NameObject(filters)
+        obj[NameObject('/Width')] = NumberObject(size[0])
+        obj[NameObject('/Height')] = NumberObject(size[1])
+        obj.pop('/DecodeParms', None)
+        count += 1
+    return count
@@ -0,0 +1,296 @@
+"""页面总览网格
+
+以缩略图网格显示所有已添加文件的全部页面。画布只为可见行（及上下各一行）
+创建图元，滚动时回收离开视口的单元格，缩略图按需在后台以低分辨率渲染，
+数千页的文档也能保持流畅。
+"""
+import bisect
+import tkinter as tk
+from tkinter import ttk
+
+from PIL import ImageTk
+
+from instrumentation import timed
+from render_backend import make_display_image
+from render_scheduler import RenderScheduler
+
+THUMBNAIL_SIZE = 150  # 缩略图长边像素数
+CELL_PADDING = 10
+LABEL_HEIGHT = 22
+CELL_WIDTH = THUMBNAIL_SIZE + CELL_PADDING * 2
+CELL_HEIGHT = THUMBNAIL_SIZE + LABEL_HEIGHT + CELL_PADDING * 2
+
+
+class PageGridView:
+    """页面总览窗口
+
+    单击选中页面，双击在主预览中打开，右键或 R 键把页面顺时针旋转 90°。
+    旋转直接写入 app.file_rotations，与主预览的“旋转”按钮等效。
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.window = tk.Toplevel(app.root)
+        self.window.title("页面总览")
+        self.window.geometry("900x700")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.scheduler = RenderScheduler(self.window)
+        self.paths = []        # 参与显示的文件
+        self.starts = []       # 每个文件第一页的全局序号
+        self.total_pages = 0
+        self.columns = 1
+        self.cells = {}        # 全局序号 -> 该单元格的图元编号
+        self.photos = {}       # 全局序号 -> PhotoImage（防止被回收）
+        self.selected = None
+        self.visible_range = (0, 0)  # 工作线程据此跳过已滚出视口的任务
+        self.redraw_pending = False
+
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        colors = self.app.colors
+        toolbar = ttk.Frame(self.window, padding=(10, 10, 10, 0))
+        toolbar.pack(fill='x')
+        ttk.Label(
+            toolbar,
+            text="单击选择，双击在预览中打开，右键或 R 键旋转",
+            foreground=colors['light_text']
+        ).pack(side='left')
+        ttk.Button(
+            toolbar,
+            text="旋转",
+            style='Primary.TButton',
+            width=8,
+            command=self.rotate_selected
+        ).pack(side='right')
+
+        body = ttk.Frame(self.window, padding=10)
+        body.pack(fill='both', expand=True)
+        self.canvas = tk.Canvas(body, bg=colors['bg'], highlightthickness=0)
+        scrollbar = ttk.Scrollbar(
+            body,
+            orient="vertical",
+            style="Custom.Vertical.TScrollbar",
+            command=self.on_scrollbar
+        )
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        self.canvas.bind('<Configure>', self.on_canvas_resize)
+        self.canvas.bind('<MouseWheel>', self.on_mouse_wheel)
+        self.canvas.bind('<Button-4>', lambda e: self.scroll_units(-1))
+        self.canvas.bind('<Button-5>', lambda e: self.scroll_units(1))
+        self.canvas.bind('<Button-1>', self.on_click)
+        self.canvas.bind('<Double-Button-1>', self.on_double_click)
+        self.canvas.bind('<Button-3>', self.on_right_click)
+        self.window.bind('<Key-r>', lambda e: self.rotate_selected())
+
+    def close(self):
+        self.scheduler.shutdown()
+        self.app.page_grid = None
+        self.window.destroy()
+
+    # ---- 布局与虚拟化 ----
+
+    def refresh(self):
+        """文件列表变化后重建页面序号并重绘"""
+        self.paths = []
+        self.starts = []
+        total = 0
+        for pdf_path in self.app.pdf_files:
+            if pdf_path in self.app.indexing:
+                continue  # 后台解析完成后会再次刷新
+            info = self.app.doc_index.get(pdf_path)
+            if not info.ok or info.page_count == 0:
+                continue
+            self.paths.append(pdf_path)
+            self.starts.append(total)
+            total += info.page_count
+        self.total_pages = total
+        self.selected = None
+        self.clear_cells()
+        self.update_scrollregion()
+        self.schedule_redraw()
+
+    def locate(self, index):
+        """全局序号 -> (文件路径, 页码)"""
+        i = bisect.bisect_right(self.starts, index) - 1
+        return self.paths[i], index - self.starts[i]
+
+    def index_of(self, pdf_path, page):
+        try:
+            i = self.paths.index(pdf_path)
+        except ValueError:
+            return None
+        return self.starts[i] + page
+
+    def update_scrollregion(self):
+        rows = -(-self.total_pages // self.columns)
+        self.canvas.configure(scrollregion=(0, 0, self.columns * CELL_WIDTH, rows * CELL_HEIGHT))
+
+    def on_canvas_resize(self, event):
+        columns = max(1, event.width // CELL_WIDTH)
+        if columns != self.columns:
+            self.columns = columns
+            self.clear_cells()
+            self.update_scrollregion()
+        self.schedule_redraw()
+
+    def on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_redraw()
+
+    def on_mouse_wheel(self, event):
+        self.scroll_units(-1 if event.delta > 0 else 1)
+
+    def scroll_units(self, units):
+        self.canvas.yview_scroll(units, 'units')
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        """同一轮事件中的多次滚动只重绘一次"""
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.window.after_idle(self.redraw)
+
+    def redraw(self):
+        self.redraw_pending = False
+        if not self.total_pages:
+            return
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        first_row = max(int(top // CELL_HEIGHT) - 1, 0)
+        last_row = int(bottom // CELL_HEIGHT) + 1
+        first = first_row * self.columns
+        last = min((last_row + 1) * self.columns, self.total_pages)
+        self.visible_range = (first, last)
+
+        for index in [i for i in self.cells if not first <= i < last]:
+            self.remove_cell(index)
+        for index in range(first, last):
+            if index not in self.cells:
+                self.create_cell(index)
+
+    def clear_cells(self):
+        for index in list(self.cells):
+            self.remove_cell(index)
+
+    def remove_cell(self, index):
+        for item in self.cells.pop(index):
+            self.canvas.delete(item)
+        self.photos.pop(index, None)
+
+    def cell_origin(self, index):
+        row, column = divmod(index, self.columns)
+        return column * CELL_WIDTH, row * CELL_HEIGHT
+
+    def create_cell(self, index):
+        colors = self.app.colors
+        pdf_path, page = self.locate(index)
+        x, y = self.cell_origin(index)
+        frame = self.canvas.create_rectangle(
+            x + 4, y + 4, x + CELL_WIDTH - 4, y + CELL_HEIGHT - 4,
+            outline=colors['primary'] if index == self.selected else colors['border'],
+            width=2 if index == self.selected else 1
+        )
+        image = self.canvas.create_image(
+            x + CELL_WIDTH // 2, y + CELL_PADDING + THUMBNAIL_SIZE // 2, anchor='center'
+        )
+        label = self.canvas.create_text(
+            x + CELL_WIDTH // 2, y + CELL_HEIGHT - CELL_PADDING - LABEL_HEIGHT // 2,
+            text=self.cell_text(pdf_path, page),
+            fill=colors['text'],
+            font=('Microsoft YaHei UI', 9)
+        )
+        self.cells[index] = (frame, image, label)
+        self.request_thumbnail(index, pdf_path, page)
+
+    def cell_text(self, pdf_path, page):
+        rotation = self.app.file_rotations.get(pdf_path, {}).get(page, 0)
+        file_no = self.paths.index(pdf_path) + 1
+        text = f"{file_no}-{page + 1}"
+        return f"{text}  ↻{rotation}°" if rotation else text
+
+    # ---- 缩略图 ----
+
+    def request_thumbnail(self, index, pdf_path, page):
+        img = self.app.thumb_cache.get((pdf_path, page))
+        if img is not None:
+            self.show_thumbnail(index, pdf_path, page, img)
+            return
+        self.scheduler.submit(
+            (pdf_path, page),
+            lambda: self.load_if_visible(index, pdf_path, page),
+            lambda img, error: self.on_thumbnail(index, pdf_path, page, img, error)
+        )
+
+    def load_if_visible(self, index, pdf_path, page):
+        """在工作线程中执行：快速滚动时跳过已离开视口的页面"""
+        first, last = self.visible_range
+        if not first <= index < last:
+            return None
+        return self.app.load_thumbnail(pdf_path, page)
+
+    def on_thumbnail(self, index, pdf_path, page, img, error):
+        if img is None or error is not None:
+            return
+        if index in self.cells and self.locate(index) == (pdf_path, page):
+            self.show_thumbnail(index, pdf_path, page, img)
+
+    def show_thumbnail(self, index, pdf_path, page, img):
+        rotation = self.app.file_rotations.get(pdf_path, {}).get(page, 0)
+        display_img = make_display_image(img, rotation, THUMBNAIL_SIZE, THUMBNAIL_SIZE,
+                                         max_side=THUMBNAIL_SIZE)
+        with timed('photo', source='thumbnail'):
+            photo = ImageTk.PhotoImage(display_img)
+        self.photos[index] = photo
+        self.canvas.itemconfigure(self.cells[index][1], image=photo)
+
+    def refresh_page(self, pdf_path, page):
+        """页面旋转后重绘对应的单元格"""
+        index = self.index_of(pdf_path, page)
+        if index is not None and index in self.cells:
+            self.remove_cell(index)
+            self.create_cell(index)
+
+    # ---- 交互 ----
+
+    def index_at(self, event):
+        x = self.canvas.canvasx(event.x)
+        y = self.canvas.canvasy(event.y)
+        column = int(x // CELL_WIDTH)
+        if column >= self.columns:
+            return None
+        index = int(y // CELL_HEIGHT) * self.columns + column
+        return index if 0 <= index < self.total_pages else None
+
+    def select(self, index):
+        previous, self.selected = self.selected, index
+        for i in (previous, index):
+            if i is not None and i in self.cells:
+                self.remove_cell(i)
+                self.create_cell(i)
+
+    def on_click(self, event):
+        index = self.index_at(event)
+        if index is not None:
+            self.select(index)
+            self.window.focus_set()
+
+    def on_double_click(self, event):
+        index = self.index_at(event)
+        if index is not None:
+            self.app.show_page(*self.locate(index))
+
+    def on_right_click(self, event):
+        index = self.index_at(event)
+        if index is not None:
+            self.select(index)
+            self.app.rotate_page(*self.locate(index))
+
+    def rotate_selected(self):
+        if self.selected is not None:
+            self.app.rotate_page(*self.locate(self.selected))
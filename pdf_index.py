@@ -0,0 +1,163 @@
+"""PDF 文档元数据索引
+
+每个文档只解析一次，记录页数、页面尺寸、已有的 /Rotate、加密和损坏状态。
+文件修改时间或大小变化后自动重建，翻页等操作无需重新解析 PDF。
+批量添加文件时用 index_many() 在后台（可用进程池）逐个建立索引。
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from instrumentation import timed
+
+
+class DocumentInfo:
+    """单个 PDF 文档的元数据"""
+
+    __slots__ = ('path', 'signature', 'page_count', 'page_sizes',
+                 'page_rotations', 'encrypted', 'damaged', 'error')
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.page_count = 0
+        self.page_sizes = []      # 每页 MediaBox 的 (宽, 高)，单位为点
+        self.page_rotations = []  # 每页原有的 /Rotate 角度
+        self.encrypted = False
+        self.damaged = False      # 结构有误、按容错模式才能读出
+        self.error = None         # 解析失败时的错误信息
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def read_document_info(path):
+    """解析 PDF 并返回 DocumentInfo，解析失败时记录在 error 中而不抛出
+
+    先按严格模式解析；失败但容错模式能读出时标记为 damaged。
+    """
+    try:
+        info = DocumentInfo(path, file_signature(path))
+    except OSError as e:
+        info = DocumentInfo(path, None)
+        info.error = str(e)
+        return info
+    try:
+        with timed('parse', path=path, source='index'):
+            try:
+                _read_pages(path, info, strict=True)
+            except Exception:
+                info = DocumentInfo(path, info.signature)
+                _read_pages(path, info, strict=False)
+                info.damaged = True
+    except Exception as e:
+        info.error = str(e)
+    return info
+
+
+def _read_pages(path, info, strict):
+    # PyPDF2 导入较慢，首次解析时才导入
+    from pdf_source import mapped_reader
+    from stream_writer import page_rotation
+
+    with mapped_reader(path, strict) as reader:
+        info.encrypted = reader.is_encrypted
+        if reader.is_encrypted and not reader.decrypt(''):
+            raise ValueError("文件已加密，需要密码才能打开")
+        for page in reader.pages:
+            box = page.mediabox
+            info.page_sizes.append((float(box.width), float(box.height)))
+            info.page_rotations.append(page_rotation(page))
+    info.page_count = len(info.page_sizes)
+
+
+class DocumentIndex:
+    """按文件路径缓存 DocumentInfo（线程安全）"""
+
+    def __init__(self):
+        self._infos = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """返回最新的文档信息，文件变化后自动重新解析
+
+        文件被移动或删除时返回记录了错误的 DocumentInfo，不抛出异常。
+        """
+        try:
+            signature = file_signature(path)
+        except OSError:
+            return self._store(read_document_info(path))
+        with self._lock:
+            info = self._infos.get(path)
+        if info is not None and info.signature == signature:
+            return info
+
+        return self._store(read_document_info(path))
+
+    def _store(self, info):
+        with self._lock:
+            self._infos[info.path] = info
+        return info
+
+    def _cached(self, path):
+        """已是最新的缓存项；没有、已过期或文件无法访问时返回 None"""
+        with self._lock:
+            info = self._infos.get(path)
+        if info is None:
+            return None
+        try:
+            return info if info.signature == file_signature(path) else None
+        except OSError:
+            return None
+
+    def index_many(self, paths, workers=1, cancel_event=None):
+        """批量建立索引，按完成顺序逐个产出 DocumentInfo
+
+        已是最新的文档立即产出；workers > 1 时在进程池中并行解析。
+        cancel_event（threading.Event）被设置后停止产出并取消排队中的任务。
+        """
+        pending = []
+        for path in paths:
+            info = self._cached(path)
+            if info is not None:
+                yield info
+            else:
+                pending.append(path)
+
+        if workers <= 1 or len(pending) < 2:
+            for path in pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                yield self._store(read_document_info(path))
+            return
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = [executor.submit(read_document_info, path) for path in pending]
+            try:
+                for future in as_completed(futures):
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    yield self._store(future.result())
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def page_count(self, path):
+        info = self.get(path)
+        if info.error is not None:
+            raise ValueError(info.error)
+        return info.page_count
+
+    def invalidate(self, path):
+        with self._lock:
+            self._infos.pop(path, None)
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._infos
@@ -1,14 +1,42 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PyPDF2 import PdfReader, PdfWriter
 import os
 import sys
-from pdf2image import convert_from_path
-from PIL import Image, ImageTk
 import tempfile
-import subprocess
+import threading
+import time
+import queue
+import multiprocessing
+
+# 启动时只导入轻量模块；PyPDF2、PIL、PyMuPDF 等在首次使用时导入，
+# 窗口显示后由 warm_up() 在后台线程中提前加载
+import instrumentation
+from composition import Composition, PageEntry
+from composition_editor import CompositionEditor
+from file_intake import expand_paths, path_key
+from file_list import FileList
+from icon_assets import build_window_icons, find_window_icons, icon_cache_dir
+from pdf_index import DocumentIndex
+from preview_cache import DiskRenderCache, PreviewCache
+from render_backend import RENDER_BUCKETS, choose_bucket, create_renderer, make_display_image
+from render_scheduler import RenderScheduler
 
 class PDFMergerApp:
+    PREFETCH_PAGES = 3  # 预览时向前、向后各预取的页数
+    RESIZE_REDRAW_MS = 50   # 拖动窗口期间快速重绘的最小间隔
+    RESIZE_SETTLE_MS = 200  # 停止拖动多久后按新尺寸重新渲染
+    INDEX_PROCESS_THRESHOLD = 16  # 一次添加至少这么多文件时用进程池并行解析
+    MULTI_SELECT_MODIFIERS = 0x0001 | 0x0004  # Shift、Ctrl 点击交给列表框默认的多选处理
+    SORT_CHOICES = (  # 排序菜单：(显示文字, file_list.SORT_KEYS 中的键, 是否倒序)
+        ("名称 A→Z", 'name', False),
+        ("名称 Z→A", 'name', True),
+        ("时间 旧→新", 'date', False),
+        ("时间 新→旧", 'date', True),
+        ("大小 小→大", 'size', False),
+        ("大小 大→小", 'size', True),
+    )
+    IMAGE_DPI_CHOICES = ("原始图像", "300 DPI", "200 DPI", "150 DPI")  # 压缩输出时的图像分辨率
+    
     def __init__(self, root):
         self.root = root
         self.root.title("PDF合并工具")
@@ -86,47 +114,134 @@ class PDFMergerApp:
             bordercolor=self.colors['border']
         )
         
-        # 设置窗口图标
-        try:
-            if getattr(sys, 'frozen', False):
-                # 打包后的路径
-                icon_path = os.path.join(sys._MEIPASS, 'icon.png')
-            else:
-                # 开发时的路径
-                icon_path = 'icon.png'
-                
-            if os.path.exists(icon_path):
-                # 同时设置 iconbitmap 和 iconphoto
-                img = Image.open(icon_path)
-                # 创建临时 ICO 文件
-                ico_path = os.path.join(tempfile.gettempdir(), 'temp_icon.ico')
-                img.save(ico_path, format='ICO', sizes=[(32, 32)])
-                self.root.iconbitmap(ico_path)
-                
-                # 设置窗口图标
-                icon = tk.PhotoImage(file=icon_path)
-                self.root.iconphoto(True, icon)
-                
-                # 清理临时文件
-                try:
-                    os.remove(ico_path)
-                except:
-                    pass
-                    
-        except Exception as e:
-            print(f"加载图标失败: {e}")
-        
-        self.pdf_files = []
+        # 设置窗口图标（使用预先生成的小尺寸图标）
+        self.window_icon = None
+        self.set_window_icon()
+        
+        self.pdf_files = FileList()  # 文件顺序的唯一来源，列表框只负责显示
+        self.row_styles = {}  # 路径 -> (显示文字, 颜色)，状态变化前缓存
+        self.pending_rows = None  # 待重绘的行范围 [first, last]，空闲时一次刷新
+        self.drag_data = None  # 拖拽进行中时记录按下的位置和是否已移动
+        self.indexing = set()  # 正在后台解析、尚未建立索引的文件
+        self.index_updates = queue.Queue()  # 后台解析结果，由主线程轮询
+        self.index_cancel = threading.Event()  # 关闭窗口时停止后台解析
+        self.index_polling = False
+        self.intake_pending = 0  # 仍在后台展开目录的添加操作数
         self.current_preview = None
         self.current_page = 0
         self.file_rotations = {}
-        self.preview_cache = {}  # 添加预览缓存
+        self.preview_cache = PreviewCache(max_bytes=256 * 1024 * 1024)  # 预览缓存（按字节限额的 LRU）
+        self.display_cache = PreviewCache(max_bytes=64 * 1024 * 1024)  # 缩放、旋转后的显示图像
+        self.disk_cache = DiskRenderCache(max_bytes=512 * 1024 * 1024)  # 持久渲染缓存
+        self.thumb_cache = PreviewCache(max_bytes=32 * 1024 * 1024)  # 页面总览的缩略图
+        self.page_grid = None  # 页面总览窗口（PageGridView），未打开时为 None
+        for name, cache in (('preview', self.preview_cache), ('display', self.display_cache),
+                            ('thumb', self.thumb_cache), ('disk', self.disk_cache)):
+            instrumentation.register_cache(name, cache)
+        self.debug_overlay = None  # 调试面板（F12 切换）
+        self.debug_enabled_timing = False  # 计时是否由调试面板开启
+        self.composition = None  # 页面编排（Composition），为 None 时按文件合并全部页面
+        self.composition_editor = None
+        self.doc_index = DocumentIndex()  # 页数、页面尺寸等元数据，每个文件只解析一次
+        # 渲染后端：优先进程内渲染（文档保持打开），否则回退到 pdftoppm；
+        # 创建时会导入 PyMuPDF，推迟到首次使用
+        self._renderer = None
+        self._renderer_lock = threading.Lock()
+        # 后台渲染与相邻页预取
+        self.render_scheduler = RenderScheduler(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.merge_cancel = None  # 合并进行中时为 threading.Event
+        self.merge_thread = None
+        self.merge_dialog = None
+        # 记住上一次合并，只改了旋转或顺序时增量更新输出（首次合并时创建）
+        self.incremental_merger = None
         
         # 绑定主窗口大小变化事件
         self.root.bind('<Configure>', self.on_window_resize)
         self.last_window_size = None
+        self.resize_redraw_job = None  # 拖动过程中待执行的快速重绘
+        self.resize_settle_job = None  # 停止拖动后的正式重新预览
+        self.root.bind('<F12>', self.toggle_debug_overlay)
         
         self.setup_ui()
+        # 首次绘制完成后再在后台加载较重的模块
+        self.root.after(100, self.warm_up)
+        
+    @property
+    def renderer(self):
+        """渲染器，首次访问时创建（可在后台线程调用）"""
+        with self._renderer_lock:
+            if self._renderer is None:
+                self._renderer = create_renderer(self.get_poppler_path())
+            return self._renderer
+    
+    def warm_up(self):
+        """在后台线程中预先导入合并、渲染所需的模块并创建渲染器"""
+        def load():
+            try:
+                import merge_engine  # noqa: F401  导入 PyPDF2
+                from PIL import ImageTk  # noqa: F401
+                self.renderer
+            except Exception as e:
+                print(f"预加载失败: {e}")
+        threading.Thread(target=load, name="warm-up", daemon=True).start()
+    
+    def set_window_icon(self):
+        """加载打包时生成的窗口图标；开发环境中缺少时在后台生成，完成后再设置"""
+        if getattr(sys, 'frozen', False):
+            # 打包后的路径
+            icons = find_window_icons(sys._MEIPASS)
+            source_png = None
+        else:
+            # 开发时的路径
+            source_png = 'icon.png'
+            icons = find_window_icons(icon_cache_dir(), source_png)
+        
+        if icons is not None:
+            self.apply_window_icon(*icons)
+        elif source_png is not None and os.path.exists(source_png):
+            result = {}
+            
+            def build():
+                try:
+                    result['icons'] = build_window_icons(source_png, icon_cache_dir())
+                except Exception as e:
+                    print(f"生成图标失败: {e}")
+            
+            thread = threading.Thread(target=build, name="icon-build", daemon=True)
+            thread.start()
+            
+            def check():
+                if thread.is_alive():
+                    self.root.after(100, check)
+                elif 'icons' in result:
+                    self.apply_window_icon(*result['icons'])
+            self.root.after(100, check)
+    
+    def apply_window_icon(self, ico_path, png_path):
+        try:
+            if os.name == 'nt':
+                self.root.iconbitmap(ico_path)
+            self.window_icon = tk.PhotoImage(file=png_path)
+            self.root.iconphoto(True, self.window_icon)
+        except Exception as e:
+            print(f"加载图标失败: {e}")
+        
+    def on_close(self):
+        """关闭窗口时取消合并、停止后台渲染和解析并释放渲染器持有的文档"""
+        self.index_cancel.set()
+        if self.merge_cancel is not None:
+            # 等待合并线程在下一个检查点退出并删除临时文件
+            self.merge_cancel.set()
+            self.merge_thread.join(timeout=10)
+        if self.page_grid is not None:
+            self.page_grid.close()
+        if self.composition_editor is not None:
+            self.composition_editor.close()
+        self.render_scheduler.shutdown()
+        if self._renderer is not None:
+            self._renderer.close()
+        self.root.destroy()
         
     def get_poppler_path(self):
         if getattr(sys, 'frozen', False):
@@ -165,13 +280,45 @@ class PDFMergerApp:
         )
         add_btn.pack(side='left', padx=(0, 10))
         
-        merge_btn = ttk.Button(
+        ttk.Button(
+            btn_frame,
+            text="添加文件夹",
+            style='Primary.TButton',
+            command=self.add_folder
+        ).pack(side='left', padx=(0, 10))
+        
+        self.merge_btn = ttk.Button(
             btn_frame,
             text="合并PDF",
             style='Primary.TButton',
             command=self.merge_pdfs
         )
-        merge_btn.pack(side='left')
+        self.merge_btn.pack(side='left')
+        
+        # 合并选项
+        self.dedup_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            btn_frame,
+            text="去除重复资源",
+            variable=self.dedup_var
+        ).pack(side='left', padx=(10, 0))
+        
+        self.optimize_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            btn_frame,
+            text="压缩输出",
+            variable=self.optimize_var
+        ).pack(side='left', padx=(10, 0))
+        
+        # 压缩输出时图像的目标分辨率
+        self.image_dpi_var = tk.StringVar(value=self.IMAGE_DPI_CHOICES[0])
+        ttk.Combobox(
+            btn_frame,
+            textvariable=self.image_dpi_var,
+            values=self.IMAGE_DPI_CHOICES,
+            state='readonly',
+            width=9
+        ).pack(side='left', padx=(5, 0))
         
         # 文件列表区域（使用卡片样式）
         list_frame = ttk.Frame(left_frame, style='Card.TFrame')
@@ -200,7 +347,7 @@ class PDFMergerApp:
         # 文件列表
         self.file_listbox = tk.Listbox(
             list_container,
-            selectmode=tk.SINGLE,
+            selectmode=tk.EXTENDED,
             font=('Microsoft YaHei UI', 10),
             bg=self.colors['bg'],
             fg=self.colors['text'],
@@ -233,8 +380,11 @@ class PDFMergerApp:
         list_container.grid_columnconfigure(0, weight=1)
         list_container.grid_rowconfigure(0, weight=1)
         
-        # 绑定选择事件
+        # 绑定选择和拖拽排序事件
         self.file_listbox.bind('<<ListboxSelect>>', self.on_select_file)
+        self.file_listbox.bind('<Button-1>', self.on_drag_start)
+        self.file_listbox.bind('<B1-Motion>', self.on_drag_motion)
+        self.file_listbox.bind('<ButtonRelease-1>', self.on_drag_release)
         
         # 文件操作按钮
         control_frame = ttk.Frame(left_frame)
@@ -243,7 +393,8 @@ class PDFMergerApp:
         for text, command in [
             ("上移", self.move_up),
             ("下移", self.move_down),
-            ("删除", self.remove_file)
+            ("删除", self.remove_file),
+            ("编排", self.show_composition_editor)
         ]:
             btn = ttk.Button(
                 control_frame,
@@ -254,6 +405,30 @@ class PDFMergerApp:
             )
             btn.pack(side='left', padx=(0, 10))
         
+        # 页面编排生效时的提示：此时合并按编排输出，而不是按文件列表
+        self.composition_frame = ttk.Frame(left_frame)
+        self.composition_label = ttk.Label(
+            self.composition_frame,
+            foreground=self.colors['primary']
+        )
+        self.composition_label.pack(side='left')
+        ttk.Button(
+            self.composition_frame,
+            text="恢复按文件合并",
+            command=self.discard_composition
+        ).pack(side='left', padx=(10, 0))
+        
+        self.sort_var = tk.StringVar(value="排序")
+        sort_box = ttk.Combobox(
+            control_frame,
+            textvariable=self.sort_var,
+            values=[label for label, _, _ in self.SORT_CHOICES],
+            state='readonly',
+            width=10
+        )
+        sort_box.pack(side='left')
+        sort_box.bind('<<ComboboxSelected>>', self.sort_files)
+        
         # 右侧预览面板
         right_frame = ttk.Frame(self.root, padding="20")
         right_frame.grid(row=0, column=1, sticky="nsew")
@@ -309,7 +484,8 @@ class PDFMergerApp:
         for text, command in [
             ("上一页", self.prev_page),
             ("下一页", self.next_page),
-            ("旋转", self.rotate_page)
+            ("旋转", self.rotate_page),
+            ("总览", self.show_page_grid)
         ]:
             btn = ttk.Button(
                 button_container,
@@ -321,89 +497,355 @@ class PDFMergerApp:
             btn.pack(side='left', padx=5)
     
     def on_window_resize(self, event):
-        """只处理主窗口大小变化事件"""
+        """只处理主窗口大小变化事件
+
+        拖动窗口边缘会连续产生大量 <Configure> 事件：拖动期间最多每
+        RESIZE_REDRAW_MS 毫秒用已缓存的图像快速缩放一次，停止拖动
+        RESIZE_SETTLE_MS 毫秒后才按新尺寸的渲染档位重新预览。
+        """
         if event.widget == self.root:  # 只响应主窗口的大小变化
             new_size = (self.root.winfo_width(), self.root.winfo_height())
             
             # 如果主窗口尺发生变化且有当前览的文件
             if new_size != self.last_window_size and self.file_listbox.curselection():
                 self.last_window_size = new_size
-                # 重新加载预览
-                idx = self.file_listbox.curselection()[0]
-                self.preview_pdf(self.pdf_files[idx])
+                if self.resize_redraw_job is None:
+                    self.resize_redraw_job = self.root.after(
+                        self.RESIZE_REDRAW_MS, self.redraw_during_resize
+                    )
+                if self.resize_settle_job is not None:
+                    self.root.after_cancel(self.resize_settle_job)
+                self.resize_settle_job = self.root.after(
+                    self.RESIZE_SETTLE_MS, self.on_resize_settled
+                )
+    
+    def redraw_during_resize(self):
+        """用任意已缓存档位的图像快速适应新尺寸，不渲染、不写入显示缓存"""
+        self.resize_redraw_job = None
+        if not self.file_listbox.curselection():
+            return
+        pdf_path = self.pdf_files[self.file_listbox.curselection()[0]]
+        img = self.cached_page_image(pdf_path, self.current_page, RENDER_BUCKETS[0])
+        if img is None:
+            return  # 保留当前显示的图像，等停止拖动后再渲染
+        from PIL import Image, ImageTk
+        
+        rotation = self.file_rotations.get(pdf_path, {}).get(self.current_page, 0)
+        display_img = make_display_image(
+            img, rotation,
+            self.preview_container.winfo_width(),
+            self.preview_container.winfo_height(),
+            resample=Image.Resampling.NEAREST
+        )
+        with instrumentation.timed('photo'):
+            photo = ImageTk.PhotoImage(display_img)
+        self.preview_label.configure(image=photo)
+        self.preview_label.image = photo
+    
+    def on_resize_settled(self):
+        """窗口大小稳定后按新尺寸的档位重新预览（必要时以更高分辨率渲染）"""
+        self.resize_settle_job = None
+        if self.resize_redraw_job is not None:
+            self.root.after_cancel(self.resize_redraw_job)
+            self.resize_redraw_job = None
+        if self.file_listbox.curselection():
+            idx = self.file_listbox.curselection()[0]
+            self.preview_pdf(self.pdf_files[idx])
     
     def add_files(self):
         files = filedialog.askopenfilenames(
             filetypes=[("PDF files", "*.pdf")]
         )
-        for file in files:
-            if file not in self.pdf_files:
-                self.pdf_files.append(file)
-                self.file_listbox.insert(tk.END, os.path.basename(file))
+        self.add_paths(files)
     
-    def move_up(self):
-        idx = self.file_listbox.curselection()
-        if not idx or idx[0] == 0:
+    def add_folder(self):
+        """添加目录（含子目录）中的全部 PDF"""
+        directory = filedialog.askdirectory(title="选择包含PDF的文件夹")
+        if directory:
+            self.add_paths([directory])
+    
+    def add_paths(self, paths):
+        """批量添加文件或目录
+
+        目录在后台线程中展开（大目录、网络目录不会卡住界面），找到的文件按规范路径
+        去重后一次显示全部行，再在后台逐个校验；解析结果（页数、加密、损坏）
+        到达后逐行更新，无法读取的文件标为红色。
+        """
+        self.intake_pending += 1
+        threading.Thread(
+            target=self.intake_files, args=(list(paths),), name="intake-files", daemon=True
+        ).start()
+        self.start_index_polling()
+    
+    def intake_files(self, paths):
+        """后台线程：展开目录并计算去重用的规范路径，交给主线程加入列表"""
+        found = {}
+        try:
+            for path in expand_paths(paths):
+                if self.index_cancel.is_set():
+                    break
+                found[path] = path_key(path)
+        finally:
+            self.index_updates.put(('found', found))
+    
+    def add_found_files(self, found):
+        """主线程：把后台找到的文件（{路径: 规范路径}）加入列表并开始校验"""
+        added = self.pdf_files.extend(found, found.__getitem__)
+        if not added:
             return
-        
-        current_idx = idx[0]
-        # 交换文件列表中的位置
-        self.pdf_files[current_idx], self.pdf_files[current_idx-1] = \
-            self.pdf_files[current_idx-1], self.pdf_files[current_idx]
-            
-        # 交换显示列表中的位置
-        current_text = self.file_listbox.get(current_idx)
-        above_text = self.file_listbox.get(current_idx-1)
-        
-        self.file_listbox.delete(current_idx)
-        self.file_listbox.delete(current_idx-1)
-        
-        self.file_listbox.insert(current_idx-1, current_text)
-        self.file_listbox.insert(current_idx, above_text)
-        
+        self.flush_rows()
+        first_row = self.file_listbox.size()
+        self.indexing.update(added)
+        self.file_listbox.insert(tk.END, *(self.row_style(path)[0] for path in added))
+        for row in range(first_row, len(self.pdf_files)):
+            self.file_listbox.itemconfigure(row, foreground=self.colors['light_text'])
+        
+        workers = 1
+        if len(added) >= self.INDEX_PROCESS_THRESHOLD:
+            workers = min(os.cpu_count() or 1, 4)
+        threading.Thread(
+            target=self.index_files, args=(added, workers), name="index-files", daemon=True
+        ).start()
+        self.start_index_polling()
+        self.on_files_changed()
+    
+    def start_index_polling(self):
+        if not self.index_polling:
+            self.index_polling = True
+            self.root.after(50, self.poll_index_updates)
+    
+    def index_files(self, paths, workers):
+        """后台线程：建立索引，逐个把结果交给主线程"""
+        try:
+            for info in self.doc_index.index_many(paths, workers, self.index_cancel):
+                self.index_updates.put(('indexed', info.path))
+        except Exception:
+            # 进程池异常等：剩余文件改为需要时在主线程中解析
+            self.index_updates.put(('failed', paths))
+    
+    def poll_index_updates(self):
+        """处理后台结果：新找到的文件加入列表，已完成的解析结果批量更新到列表中"""
+        done = []
+        while True:
+            try:
+                kind, payload = self.index_updates.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'found':
+                self.intake_pending -= 1
+                self.add_found_files(payload)
+            else:
+                done.extend([payload] if kind == 'indexed' else payload)
+        
+        done = [path for path in done if path in self.indexing]
+        if done:
+            self.indexing.difference_update(done)
+            for path in done:
+                self.row_styles.pop(path, None)
+                if path in self.pdf_files:
+                    self.update_row(self.pdf_files.index(path))
+            self.on_files_changed()
+        
+        if self.indexing or self.intake_pending:
+            self.root.after(50, self.poll_index_updates)
+        else:
+            self.index_polling = False
+    
+    def file_label(self, pdf_path):
+        """列表中显示的文字：文件名及解析状态"""
+        name = os.path.basename(pdf_path)
+        if pdf_path in self.indexing:
+            return f"{name}（检查中…）"
+        info = self.doc_index.get(pdf_path)
+        if not info.ok:
+            error = info.error if len(info.error) <= 40 else info.error[:40] + "…"
+            return f"{name}（无法读取：{error}）"
+        details = [f"{info.page_count}页"]
+        if info.encrypted:
+            details.append("已加密")
+        if info.damaged:
+            details.append("结构有误，已修复")
+        return f"{name}（{'，'.join(details)}）"
+    
+    def row_style(self, pdf_path):
+        """(显示文字, 颜色)；缓存到文件状态变化为止，整段重绘时无需逐个查询索引"""
+        style = self.row_styles.get(pdf_path)
+        if style is None:
+            if pdf_path in self.indexing:
+                color = self.colors['light_text']
+            elif not self.doc_index.get(pdf_path).ok:
+                color = self.colors['primary']
+            else:
+                color = self.colors['text']
+            style = self.row_styles[pdf_path] = (self.file_label(pdf_path), color)
+        return style
+    
+    def update_row(self, row):
+        """按文件的当前状态重写第 row 行，保持选中状态"""
+        text, color = self.row_style(self.pdf_files[row])
+        selected = self.file_listbox.selection_includes(row)
+        self.file_listbox.delete(row)
+        self.file_listbox.insert(row, text)
+        self.file_listbox.itemconfigure(row, foreground=color)
+        if selected:
+            self.file_listbox.selection_set(row)
+    
+    def refresh_rows(self, first, last):
+        """标记第 first 到 last 行需要按列表模型重绘
+
+        同一轮事件中的多次修改（如拖拽时连续移动）合并为空闲时的一次重绘。
+        """
+        if self.pending_rows is None:
+            self.pending_rows = [first, last]
+            self.root.after_idle(self.flush_rows)
+        else:
+            self.pending_rows[0] = min(self.pending_rows[0], first)
+            self.pending_rows[1] = max(self.pending_rows[1], last)
+    
+    def flush_rows(self):
+        """立即重绘待刷新的行：一次删除、一次插入，只为非默认颜色的行单独设置颜色"""
+        if self.pending_rows is None:
+            return
+        first, last = self.pending_rows
+        self.pending_rows = None
+        last = min(last, len(self.pdf_files) - 1)
+        if first > last:
+            return
+        selection = self.file_listbox.curselection()
+        styles = [self.row_style(path) for path in self.pdf_files[first:last + 1]]
+        self.file_listbox.delete(first, last)
+        self.file_listbox.insert(first, *(text for text, _ in styles))
+        for row, (_, color) in enumerate(styles, first):
+            if color != self.colors['text']:
+                self.file_listbox.itemconfigure(row, foreground=color)
+        for row in selection:
+            self.file_listbox.selection_set(row)
+    
+    def move_rows(self, rows, target):
+        """把 rows 处的文件整体移到 target 之前，选中移动后的行，返回新序号
+
+        列表模型立即更新，界面只重绘受影响的行且推迟到空闲时。
+        """
+        new_rows = self.pdf_files.move(rows, target)
         self.file_listbox.selection_clear(0, tk.END)
-        self.file_listbox.selection_set(current_idx-1)
+        for row in new_rows:
+            self.file_listbox.selection_set(row)
+        self.file_listbox.activate(new_rows[0])
+        self.refresh_rows(min(rows[0], new_rows[0]), max(rows[-1], new_rows[-1]))
+        return new_rows
+    
+    def move_up(self):
+        selection = self.file_listbox.curselection()
+        if not selection or selection[0] == 0:
+            return
+        new_rows = self.move_rows(selection, selection[0] - 1)
+        self.file_listbox.see(new_rows[0])
+        self.on_files_changed()
     
     def move_down(self):
-        idx = self.file_listbox.curselection()
-        if not idx or idx[0] == self.file_listbox.size()-1:
+        selection = self.file_listbox.curselection()
+        if not selection or selection[-1] == len(self.pdf_files) - 1:
             return
-        
-        current_idx = idx[0]
-        # 交换文件列表中的位置
-        self.pdf_files[current_idx], self.pdf_files[current_idx+1] = \
-            self.pdf_files[current_idx+1], self.pdf_files[current_idx]
-            
-        # 交换显示列表中的位置
-        current_text = self.file_listbox.get(current_idx)
-        below_text = self.file_listbox.get(current_idx+1)
-        
-        self.file_listbox.delete(current_idx+1)
-        self.file_listbox.delete(current_idx)
-        
-        self.file_listbox.insert(current_idx, below_text)
-        self.file_listbox.insert(current_idx+1, current_text)
-        
+        # 插入到最后一个选中项的下一项之后
+        new_rows = self.move_rows(selection, selection[-1] + 2)
+        self.file_listbox.see(new_rows[-1])
+        self.on_files_changed()
+    
+    def sort_files(self, event=None):
+        """按排序菜单的选择重排文件列表，保持原来选中的文件"""
+        choice = next(
+            (choice for choice in self.SORT_CHOICES if choice[0] == self.sort_var.get()), None
+        )
+        if choice is None or not self.pdf_files:
+            return
+        _, by, reverse = choice
+        selected = [self.pdf_files[row] for row in self.file_listbox.curselection()]
+        self.pdf_files.sort(by, reverse)
         self.file_listbox.selection_clear(0, tk.END)
-        self.file_listbox.selection_set(current_idx+1)
+        rows = sorted(self.pdf_files.index(path) for path in selected)
+        for row in rows:
+            self.file_listbox.selection_set(row)
+        self.refresh_rows(0, len(self.pdf_files) - 1)
+        if rows:
+            self.file_listbox.see(rows[0])
+        self.on_files_changed()
     
     def remove_file(self):
-        idx = self.file_listbox.curselection()
-        if not idx:
+        selection = self.file_listbox.curselection()
+        if not selection:
             return
         
-        file_path = self.pdf_files[idx[0]]
-        self.pdf_files.pop(idx[0])
-        self.file_listbox.delete(idx[0])
+        self.flush_rows()
+        removed = self.pdf_files.remove(selection)
+        for row in reversed(selection):
+            self.file_listbox.delete(row)
         self.preview_label.configure(image='')
         self.page_label.configure(text='')
+        self.render_scheduler.cancel_pending()
         
         # 清理相关缓存
-        if file_path in self.file_rotations:
-            del self.file_rotations[file_path]
-        # 清理预览缓存
-        self.preview_cache = {k: v for k, v in self.preview_cache.items() 
-                            if not k.startswith(file_path)}
+        for file_path in removed:
+            self.indexing.discard(file_path)
+            self.row_styles.pop(file_path, None)
+            self.file_rotations.pop(file_path, None)
+            if self._renderer is not None:
+                self._renderer.close_document(file_path)
+            self.doc_index.invalidate(file_path)
+            # 清理预览缓存
+            self.preview_cache.invalidate_document(file_path)
+            self.display_cache.invalidate_document(file_path)
+            self.thumb_cache.invalidate_document(file_path)
+        self.on_files_changed()
+    
+    def on_files_changed(self):
+        """文件增删或顺序变化后同步页面总览和页面编排
+
+        编排中页面的顺序与文件列表顺序无关，只同步增删的文件；
+        需要按文件顺序重排时使用编排窗口的“重置为全部页面”。
+        """
+        if self.page_grid is not None:
+            self.page_grid.refresh()
+        if self.composition is not None:
+            self.composition.sync_sources(self.pdf_files, self.page_count_or_zero)
+            if self.composition_editor is not None:
+                self.composition_editor.refresh()
+            self.update_composition_indicator()
+    
+    def update_composition_indicator(self):
+        """编排生效时在主窗口显示提示，否则隐藏"""
+        if self.composition is None:
+            self.composition_frame.pack_forget()
+            return
+        self.composition_label.configure(
+            text=f"按页面编排合并：共 {len(self.composition)} 页，"
+                 f"来自 {len(self.composition.sources())} 个文件"
+        )
+        if not self.composition_frame.winfo_manager():
+            self.composition_frame.pack(fill='x', pady=(10, 0))
+    
+    def discard_composition(self):
+        """放弃页面编排，合并恢复为按文件顺序输出全部页面"""
+        self.composition = None
+        if self.composition_editor is not None:
+            self.composition_editor.close()
+        self.update_composition_indicator()
+    
+    def page_count_or_zero(self, pdf_path):
+        """页数；无法解析或仍在后台解析的文件视为 0 页"""
+        if pdf_path in self.indexing:
+            return 0
+        return self.doc_index.get(pdf_path).page_count
+    
+    def show_composition_editor(self):
+        """打开页面编排；首次打开时以全部文件的全部页面为初始编排"""
+        if self.composition is None:
+            self.composition = Composition.from_files(
+                self.pdf_files, self.page_count_or_zero, self.file_rotations
+            )
+        if self.composition_editor is None:
+            self.composition_editor = CompositionEditor(self)
+        else:
+            self.composition_editor.window.lift()
     
     def on_select_file(self, event):
         idx = self.file_listbox.curselection()
@@ -412,113 +854,170 @@ class PDFMergerApp:
         
         file_path = self.pdf_files[idx[0]]
         self.current_page = 0
+        # 切换文件时丢弃上一个文件尚未开始的渲染任务
+        self.render_scheduler.cancel_pending()
         self.preview_pdf(file_path)
     
+    def render_bucket(self, pdf_path, page):
+        """按页面 MediaBox、旋转和当前预览区域大小选择渲染档位"""
+        info = self.doc_index.get(pdf_path)
+        page_width, page_height = info.page_sizes[page]
+        rotation = info.page_rotations[page] + self.file_rotations.get(pdf_path, {}).get(page, 0)
+        return choose_bucket(
+            page_width, page_height, rotation,
+            self.preview_container.winfo_width(),
+            self.preview_container.winfo_height()
+        )
+    
+    def cached_page_image(self, pdf_path, page, bucket):
+        """查找不小于 bucket 档位的已缓存渲染结果
+
+        所需档位用 get() 查找，命中与未命中都计入缓存统计；未命中时再看更大的档位，
+        只取实际存在的，避免一次查找记下多次未命中。
+        """
+        img = self.preview_cache.get((pdf_path, page, bucket))
+        if img is not None:
+            return img
+        for size in RENDER_BUCKETS:
+            if size > bucket and (pdf_path, page, size) in self.preview_cache:
+                img = self.preview_cache.get((pdf_path, page, size))
+                if img is not None:
+                    return img
+        return None
+    
+    def load_page_image(self, pdf_path, page, bucket):
+        """获取页面图像：磁盘缓存 → 渲染，结果写入两级缓存（可在后台线程调用）"""
+        disk_key = self.disk_cache.make_key(pdf_path, page, None, size=bucket)
+        img = self.disk_cache.get(disk_key)
+        if img is None:
+            # 直接按显示需要的尺寸渲染，不再固定 150 DPI 后缩小
+            img = self.renderer.render_page(pdf_path, page, scale_to=bucket)
+            self.disk_cache.put(disk_key, img)
+        self.preview_cache.put((pdf_path, page, bucket), img)
+        return img
+    
     def preview_pdf(self, pdf_path):
         try:
-            # 检查缓存
-            cache_key = f"{pdf_path}_{self.current_page}"
-            if cache_key in self.preview_cache:
-                img = self.preview_cache[cache_key]
-                # 获取当前页面的旋转角度
-                current_rotation = self.file_rotations.get(pdf_path, {}).get(self.current_page, 0)
-                if current_rotation:
-                    img = img.rotate(-current_rotation, expand=True, resample=Image.Resampling.BICUBIC)
-            else:
-                # 创建临时文件路径
-                temp_img_path = os.path.join(tempfile.gettempdir(), 'temp_preview.png')
-                
-                # 建 STARTUPINFO 对象来隐藏窗口
-                startupinfo = None
-                if os.name == 'nt':  # Windows 系统
-                    startupinfo = subprocess.STARTUPINFO()
-                    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                    startupinfo.wShowWindow = subprocess.SW_HIDE
-                
-                # 使用 pdftoppm 命令行工具转换 PDF 到图像
-                poppler_path = self.get_poppler_path()
-                pdftoppm_path = os.path.join(poppler_path, 'pdftoppm.exe')
-                
-                # 构建命令，降低 DPI 以提高速度
-                cmd = [
-                    pdftoppm_path,
-                    '-f', str(self.current_page + 1),
-                    '-l', str(self.current_page + 1),
-                    '-png',
-                    '-singlefile',
-                    '-r', '150',  # 降低 DPI
-                    pdf_path,
-                    os.path.splitext(temp_img_path)[0]
-                ]
-                
-                # 执行命令
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    startupinfo=startupinfo
-                )
-                process.wait()
-                
-                # 检查输出文件是否存在
-                output_file = f"{os.path.splitext(temp_img_path)[0]}.png"
-                if os.path.exists(output_file):
-                    img = Image.open(output_file)
-                    # 保存到缓存
-                    self.preview_cache[cache_key] = img.copy()
-                    
-                    # 获取当前页面的旋转角度
-                    current_rotation = self.file_rotations.get(pdf_path, {}).get(self.current_page, 0)
-                    if current_rotation:
-                        img = img.rotate(-current_rotation, expand=True, resample=Image.Resampling.BICUBIC)
-                    
-                    # 清理临时文件
-                    try:
-                        os.remove(output_file)
-                    except:
-                        pass
-            
-            # 调整图像大小
-            preview_width = self.preview_container.winfo_width()
-            preview_height = self.preview_container.winfo_height()
-            
-            if preview_width > 1 and preview_height > 1:
-                img_ratio = img.width / img.height
-                container_ratio = preview_width / preview_height
-                
-                if img_ratio > container_ratio:
-                    new_width = min(preview_width, 800)
-                    new_height = int(new_width / img_ratio)
-                else:
-                    new_height = min(preview_height, 800)
-                    new_width = int(new_height * img_ratio)
-                
-                # 使用更快的重采样方法
-                img = img.resize((new_width, new_height), 
-                               Image.Resampling.BILINEAR)  # 使用双线性插值
+            page = self.current_page
+            total_pages = self.doc_index.page_count(pdf_path)
+            bucket = self.render_bucket(pdf_path, page)
             
-            photo = ImageTk.PhotoImage(img)
-            self.preview_label.configure(
-                image=photo,
-                compound='center',
-                anchor='center'
-            )
-            self.preview_label.image = photo
+            # 检查缓存，未命中时交给后台线程渲染
+            img = self.cached_page_image(pdf_path, page, bucket)
+            if img is None:
+                self.page_label.configure(
+                    text=f"第 {page + 1} 页，共 {total_pages} 页（加载中…）"
+                )
+                self.render_scheduler.submit(
+                    (pdf_path, page, bucket),
+                    lambda: self.load_page_image(pdf_path, page, bucket),
+                    lambda img, error: self.on_page_rendered(pdf_path, page, total_pages, img, error)
+                )
+            else:
+                self.show_page_image(pdf_path, page, total_pages, img)
             
-            total_pages = len(PdfReader(pdf_path).pages)
-            self.page_label.configure(
-                text=f"第 {self.current_page + 1} 页，共 {total_pages} 页",
-                font=('Microsoft YaHei UI', 10)
-            )
+            # 预取前后相邻页面
+            self.prefetch_pages(pdf_path, page, total_pages)
         except Exception as e:
+            instrumentation.event('preview_error', path=pdf_path, error=str(e))
             messagebox.showerror("错误", f"预览失败: {str(e)}")
     
+    def prefetch_pages(self, pdf_path, page, total_pages):
+        """按距离由近到远预取前后 PREFETCH_PAGES 页，优先向后"""
+        jobs = []
+        for distance in range(1, self.PREFETCH_PAGES + 1):
+            for neighbour in (page + distance, page - distance):
+                if not 0 <= neighbour < total_pages:
+                    continue
+                bucket = self.render_bucket(pdf_path, neighbour)
+                if self.preview_cache.get((pdf_path, neighbour, bucket)) is None:
+                    jobs.append((
+                        (pdf_path, neighbour, bucket),
+                        lambda p=neighbour, b=bucket: self.load_page_image(pdf_path, p, b)
+                    ))
+        self.render_scheduler.prefetch(jobs)
+    
+    def is_current_page(self, pdf_path, page):
+        idx = self.file_listbox.curselection()
+        return bool(idx) and self.pdf_files[idx[0]] == pdf_path and self.current_page == page
+    
+    def on_page_rendered(self, pdf_path, page, total_pages, img, error):
+        """后台渲染完成（主线程回调）"""
+        if not self.is_current_page(pdf_path, page):
+            return  # 用户已翻到其他页面
+        if error is not None:
+            instrumentation.event('preview_error', path=pdf_path, page=page, error=str(error))
+            messagebox.showerror("错误", f"预览失败: {str(error)}")
+            return
+        self.show_page_image(pdf_path, page, total_pages, img)
+    
+    def show_page_image(self, pdf_path, page, total_pages, img):
+        from PIL import ImageTk
+        
+        # 获取当前页面的旋转角度
+        current_rotation = self.file_rotations.get(pdf_path, {}).get(page, 0)
+        preview_width = self.preview_container.winfo_width()
+        preview_height = self.preview_container.winfo_height()
+        
+        # 显示用图像（已缩放、已旋转）单独缓存，旋转和回看无需重新处理
+        display_key = (pdf_path, page, current_rotation, preview_width, preview_height)
+        display_img = self.display_cache.get(display_key)
+        if display_img is None:
+            display_img = make_display_image(
+                img, current_rotation, preview_width, preview_height
+            )
+            self.display_cache.put(display_key, display_img)
+        img = display_img
+        
+        with instrumentation.timed('photo'):
+            photo = ImageTk.PhotoImage(img)
+        self.preview_label.configure(
+            image=photo,
+            compound='center',
+            anchor='center'
+        )
+        self.preview_label.image = photo
+        
+        self.page_label.configure(
+            text=f"第 {page + 1} 页，共 {total_pages} 页",
+            font=('Microsoft YaHei UI', 10)
+        )
+    
+    def toggle_debug_overlay(self, event=None):
+        """在预览区域左上角显示/隐藏各阶段耗时与缓存命中率"""
+        if self.debug_overlay is not None:
+            self.debug_overlay.destroy()
+            self.debug_overlay = None
+            if self.debug_enabled_timing:
+                instrumentation.disable()
+                self.debug_enabled_timing = False
+            return
+        if not instrumentation.enabled():
+            instrumentation.enable()
+            self.debug_enabled_timing = True
+        self.debug_overlay = tk.Label(
+            self.preview_container,
+            font=('Consolas', 8),
+            justify='left',
+            anchor='nw',
+            bg='#FFFFFF',
+            fg=self.colors['text']
+        )
+        self.debug_overlay.place(x=4, y=4, anchor='nw')
+        self.update_debug_overlay()
+    
+    def update_debug_overlay(self):
+        if self.debug_overlay is None:
+            return
+        self.debug_overlay.configure(text=instrumentation.format_overlay())
+        self.debug_overlay.lift()
+        self.root.after(500, self.update_debug_overlay)
+    
     def prev_page(self):
         if not self.file_listbox.curselection():
             return
             
         idx = self.file_listbox.curselection()[0]
-        pdf = PdfReader(self.pdf_files[idx])
         
         if self.current_page > 0:
             self.current_page -= 1
@@ -529,35 +1028,99 @@ class PDFMergerApp:
             return
             
         idx = self.file_listbox.curselection()[0]
-        pdf = PdfReader(self.pdf_files[idx])
+        total_pages = self.doc_index.page_count(self.pdf_files[idx])
         
-        if self.current_page < len(pdf.pages) - 1:
+        if self.current_page < total_pages - 1:
             self.current_page += 1
             self.preview_pdf(self.pdf_files[idx])
     
-    def rotate_page(self):
-        if not self.file_listbox.curselection():
-            return
-            
-        idx = self.file_listbox.curselection()[0]
-        file_path = self.pdf_files[idx]
+    def rotate_page(self, file_path=None, page=None):
+        """把页面顺时针旋转 90°；未指定时旋转当前预览的页面"""
+        if file_path is None:
+            if not self.file_listbox.curselection():
+                return
+            idx = self.file_listbox.curselection()[0]
+            file_path = self.pdf_files[idx]
+            page = self.current_page
         
         # 初始化文件的旋转记录（如果不存在）
         if file_path not in self.file_rotations:
             self.file_rotations[file_path] = {}
         
-        # 更新当前页面的旋转角度
-        current_rotation = self.file_rotations[file_path].get(self.current_page, 0)
+        # 更新页面的旋转角度
+        current_rotation = self.file_rotations[file_path].get(page, 0)
         new_rotation = (current_rotation + 90) % 360
-        self.file_rotations[file_path][self.current_page] = new_rotation
-        
-        self.preview_pdf(file_path)
+        self.file_rotations[file_path][page] = new_rotation
+        # 编排生效时合并按编排中的旋转输出，同步旋转编排中的这一页
+        if self.composition is not None:
+            self.composition.rotate_page(file_path, page)
+            if self.composition_editor is not None:
+                self.composition_editor.refresh(self.composition_editor.selected())
+        
+        if self.is_current_page(file_path, page):
+            self.preview_pdf(file_path)
+        if self.page_grid is not None:
+            self.page_grid.refresh_page(file_path, page)
+    
+    def show_page_grid(self):
+        """打开页面总览；已打开时切换到前台"""
+        if self.page_grid is None:
+            from page_grid import PageGridView
+            self.page_grid = PageGridView(self)
+        else:
+            self.page_grid.window.lift()
+    
+    def load_thumbnail(self, pdf_path, page):
+        """以缩略图尺寸直接渲染页面（可在后台线程调用）"""
+        from page_grid import THUMBNAIL_SIZE
+        
+        disk_key = self.disk_cache.make_key(pdf_path, page, None, size=THUMBNAIL_SIZE)
+        img = self.disk_cache.get(disk_key)
+        if img is None:
+            img = self.renderer.render_page(pdf_path, page, scale_to=THUMBNAIL_SIZE)
+            self.disk_cache.put(disk_key, img)
+        self.thumb_cache.put((pdf_path, page), img)
+        return img
+    
+    def show_page(self, pdf_path, page):
+        """在主预览中显示指定文件的指定页"""
+        idx = self.pdf_files.index(pdf_path)
+        self.file_listbox.selection_clear(0, tk.END)
+        self.file_listbox.selection_set(idx)
+        self.file_listbox.see(idx)
+        self.current_page = page
+        self.render_scheduler.cancel_pending()
+        self.preview_pdf(pdf_path)
     
     def merge_pdfs(self):
+        if self.merge_cancel is not None:
+            return  # 已有合并任务在运行
+        
         if not self.pdf_files:
             messagebox.showwarning("警告", "请至少添加一个PDF文件")
             return
-            
+        if self.composition is not None and not len(self.composition):
+            messagebox.showwarning("警告", "页面编排中没有页面")
+            return
+
+        # 已确认无法读取的文件（仍在后台检查的除外）可以跳过后继续合并
+        broken = [
+            path for path in self.pdf_files
+            if path not in self.indexing and not self.doc_index.get(path).ok
+        ]
+        skipped = set()
+        if broken and self.composition is None:
+            names = "\n".join(os.path.basename(path) for path in broken[:10])
+            if len(broken) > 10:
+                names += f"\n……等 {len(broken)} 个文件"
+            if not messagebox.askyesno(
+                    "无法读取的文件", f"以下文件无法读取：\n{names}\n\n跳过这些文件继续合并？"):
+                return
+            skipped = set(broken)
+            if len(skipped) == len(self.pdf_files):
+                messagebox.showwarning("警告", "没有可以合并的文件")
+                return
+
         output_path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF files", "*.pdf")]
@@ -565,50 +1128,199 @@ class PDFMergerApp:
         
         if not output_path:
             return
-            
+        
+        # 复制一份输入，合并期间修改列表不影响正在进行的任务
+        inputs = [path for path in self.pdf_files if path not in skipped]
+        rotations = {path: dict(pages) for path, pages in self.file_rotations.items()}
+        dedup = self.dedup_var.get()
+        optimize = None
+        if self.optimize_var.get():
+            dpi = self.image_dpi_var.get().split()[0]
+            optimize = (int(dpi) if dpi.isdigit() else None, os.cpu_count() or 1)
+        composition = None
+        if self.composition is not None:
+            composition = Composition(
+                PageEntry(entry.source, entry.page, entry.rotation) for entry in self.composition
+            )
+        elif all(self.page_count_or_zero(path) for path in inputs):
+            # 按文件合并也以页面组合表示，再次合并时才能增量更新；
+            # 有无法解析的文件时仍走 merge_files，由它报告具体错误
+            composition = Composition.from_files(inputs, self.page_count_or_zero, rotations)
+        
+        self.merge_cancel = threading.Event()
+        self.merge_updates = queue.Queue()
+        self.merge_started = time.monotonic()
+        self.merge_btn.state(['disabled'])
+        self.show_merge_progress()
+        
+        self.merge_thread = threading.Thread(
+            target=self.run_merge,
+            args=(inputs, output_path, rotations, dedup, composition, optimize),
+            daemon=True
+        )
+        self.merge_thread.start()
+        self.root.after(100, self.poll_merge)
+    
+    def run_merge(self, inputs, output_path, rotations, dedup, composition=None,
+                  optimize=None):
+        """后台线程：执行合并，通过队列把进度交给主线程
+
+        composition 不为 None 时按页面编排输出，否则按文件顺序合并全部页面。
+        optimize 为 (图像目标 DPI 或 None, 进程数) 时合并后压缩输出。
+        """
+        from incremental import IncrementalMerger
+        from merge_engine import MergeCancelled, merge_files
+        from optimize import OptimizeOptions
+        
+        if optimize is not None:
+            image_dpi, workers = optimize
+            optimize = OptimizeOptions(image_dpi=image_dpi, workers=workers)
+        
+        def on_progress(progress):
+            self.merge_updates.put(('progress', (
+                progress.files_done, progress.files_total, progress.pages_done,
+                progress.bytes_done, progress.bytes_total, progress.stage
+            )))
+        
         try:
-            pdf_writer = PdfWriter()
-            
-            # 如果只有一个文件，直接处理旋转并保存
-            if len(self.pdf_files) == 1:
-                pdf_file = self.pdf_files[0]
-                pdf_reader = PdfReader(pdf_file)
-                page_rotations = self.file_rotations.get(pdf_file, {})
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    # 获取该页的旋转角度（如果有）
-                    rotation = page_rotations.get(page_num, 0)
-                    if rotation:
-                        page.rotate(rotation)
-                    pdf_writer.add_page(page)
-                    
-                with open(output_path, 'wb') as output_file:
-                    pdf_writer.write(output_file)
-                    
-                messagebox.showinfo("成功", "PDF导出完成！")
-                return
-            
-            # 多个文件的合并逻辑保持不变
-            for pdf_file in self.pdf_files:
-                pdf_reader = PdfReader(pdf_file)
-                page_rotations = self.file_rotations.get(pdf_file, {})
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    # 获取该页的旋转角度（如果有）
-                    rotation = page_rotations.get(page_num, 0)
-                    if rotation:
-                        page.rotate(rotation)
-                    pdf_writer.add_page(page)
-            
-            with open(output_path, 'wb') as output_file:
-                pdf_writer.write(output_file)
-                
-            messagebox.showinfo("成功", "PDF合并完成！")
+            if composition is not None:
+                if self.incremental_merger is None:
+                    self.incremental_merger = IncrementalMerger()
+                result = self.incremental_merger.merge(
+                    composition,
+                    output_path,
+                    progress_callback=on_progress,
+                    dedup=dedup,
+                    cancel_event=self.merge_cancel,
+                    optimize=optimize
+                )
+                file_count = len(composition.sources())
+            else:
+                result = merge_files(
+                    inputs,
+                    output_path,
+                    rotations=rotations,
+                    progress_callback=on_progress,
+                    dedup=dedup,
+                    cancel_event=self.merge_cancel,
+                    optimize=optimize
+                )
+                file_count = len(inputs)
+            self.merge_updates.put(('done', (result, file_count, dedup)))
+        except MergeCancelled:
+            self.merge_updates.put(('cancelled', None))
         except Exception as e:
-            messagebox.showerror("错误", f"操作失败: {str(e)}")
+            self.merge_updates.put(('error', e))
+    
+    def show_merge_progress(self):
+        """显示合并进度窗口"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("正在合并")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        dialog.protocol("WM_DELETE_WINDOW", self.cancel_merge)
+        
+        frame = ttk.Frame(dialog, padding=20)
+        frame.pack(fill='both', expand=True)
+        
+        self.merge_status_label = ttk.Label(frame, text="正在准备…")
+        self.merge_status_label.pack(fill='x')
+        
+        self.merge_progressbar = ttk.Progressbar(
+            frame, orient='horizontal', length=360, mode='determinate', maximum=1000
+        )
+        self.merge_progressbar.pack(fill='x', pady=10)
+        
+        self.merge_detail_label = ttk.Label(frame, style='Page.TLabel')
+        self.merge_detail_label.pack(fill='x')
+        
+        self.merge_cancel_btn = ttk.Button(
+            frame,
+            text="取消",
+            style='Primary.TButton',
+            command=self.cancel_merge
+        )
+        self.merge_cancel_btn.pack(pady=(15, 0))
+        self.merge_dialog = dialog
+    
+    def cancel_merge(self):
+        if self.merge_cancel is not None:
+            # 合并线程在下一个检查点退出并删除临时文件，随后发出 'cancelled'，
+            # 由 poll_merge 收尾；这里不等待，界面保持响应
+            self.merge_cancel.set()
+            self.merge_status_label.configure(text="正在取消…")
+            self.merge_cancel_btn.state(['disabled'])
+    
+    def poll_merge(self):
+        """主线程：刷新进度并在任务结束时收尾"""
+        while True:
+            try:
+                kind, payload = self.merge_updates.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                self.update_merge_progress(*payload)
+            else:
+                self.finish_merge(kind, payload)
+                return
+        self.root.after(100, self.poll_merge)
+    
+    def update_merge_progress(self, files_done, files_total, pages_done,
+                              bytes_done, bytes_total, stage):
+        from merge_engine import format_size
+        
+        if self.merge_cancel.is_set():
+            return
+        fraction = bytes_done / bytes_total if bytes_total else files_done / max(files_total, 1)
+        self.merge_progressbar['value'] = int(fraction * 1000)
+        
+        if stage == 'write':
+            self.merge_status_label.configure(text="正在写入输出文件…")
+        elif stage == 'optimize':
+            self.merge_status_label.configure(text="正在压缩输出文件…")
+        else:
+            self.merge_status_label.configure(text=f"已处理 {files_done}/{files_total} 个文件")
+        
+        detail = (f"{pages_done} 页，"
+                  f"{format_size(bytes_done)} / {format_size(bytes_total)}")
+        elapsed = time.monotonic() - self.merge_started
+        if 0 < fraction < 1:
+            remaining = elapsed * (1 - fraction) / fraction
+            detail += f"，预计剩余 {int(remaining) + 1} 秒"
+        self.merge_detail_label.configure(text=detail)
+    
+    def finish_merge(self, kind, payload):
+        from merge_engine import format_optimize_result, format_size
+        
+        self.merge_dialog.destroy()
+        self.merge_dialog = None
+        self.merge_cancel = None
+        self.merge_thread = None
+        self.merge_btn.state(['!disabled'])
+        
+        if kind == 'done':
+            result, file_count, dedup = payload
+            if file_count == 1:
+                message = "PDF导出完成！"
+            else:
+                message = "PDF合并完成！"
+            if result.incremental:
+                message += f"\n增量更新：仅改写 {result.patched_objects} 个对象"
+            elif dedup:
+                message += (f"\n去除重复资源 {result.dedup_objects} 个，"
+                            f"节省 {format_size(result.dedup_bytes_saved)}")
+            if result.optimize is not None:
+                message += f"\n压缩输出：{format_optimize_result(result.optimize)}"
+            messagebox.showinfo("成功", message)
+        elif kind == 'cancelled':
+            messagebox.showinfo("提示", "合并已取消")
+        else:
+            messagebox.showerror("错误", f"操作失败: {str(payload)}")
     
     def convert_png_to_ico(self, png_path):
         """将PNG转换为ICO格式，支持多种尺寸以提高清晰度"""
+        from PIL import Image
+        
         img = Image.open(png_path)
         
         # 准备多个尺寸的图标
@@ -658,58 +1370,54 @@ class PDFMergerApp:
             self.context_menu.post(event.x_root, event.y_root)
     
     def on_drag_start(self, event):
-        """开始拖拽"""
-        # 获取点击的项
+        """按下鼠标：准备拖拽排序"""
+        self.drag_data = None
+        if event.state & self.MULTI_SELECT_MODIFIERS or not self.pdf_files:
+            return None
         index = self.file_listbox.nearest(event.y)
-        if index >= 0:
-            # 保存拖拽数据
-            self.drag_data['item'] = self.file_listbox.get(index)
-            self.drag_data['index'] = index
-            self.drag_data['y'] = event.y
-            # 选中该项
-            self.file_listbox.selection_clear(0, tk.END)
-            self.file_listbox.selection_set(index)
-            self.file_listbox.activate(index)
+        selection = self.file_listbox.curselection()
+        self.drag_data = {'index': index, 'moved': False, 'collapse': False}
+        if index in selection and len(selection) > 1:
+            # 按在多选中的一项上：保留选择以便整体拖动，松开时若没有拖动再改为单选
+            self.drag_data['collapse'] = True
+            self.file_listbox.focus_set()
+            return 'break'
+        # 其余情况由列表框默认处理：单选该项并触发预览
+        return None
     
     def on_drag_motion(self, event):
-        """拖拽过程中"""
-        if self.drag_data['item']:
-            # 计算当前位置
-            cur_index = self.file_listbox.nearest(event.y)
-            if cur_index >= 0 and cur_index != self.drag_data['index']:
-                # 移动项目
-                old_index = self.drag_data['index']
-                self.move_item(old_index, cur_index)
-                self.drag_data['index'] = cur_index
+        """拖拽过程中：只移动列表模型中的选中项并重绘受影响的行，不重新渲染预览"""
+        if self.drag_data is None:
+            return None
+        selection = self.file_listbox.curselection()
+        row = self.file_listbox.nearest(event.y)
+        if not selection or row < 0 or row in selection:
+            return 'break'
+        # 向下拖时移到鼠标所在项之后，向上拖或落在选中项之间时移到其之前
+        target = row + 1 if row > selection[-1] else row
+        self.move_rows(selection, target)
+        self.drag_data['moved'] = True
+        return 'break'
     
     def on_drag_release(self, event):
-        """结束拖拽"""
-        self.drag_data = {'item': None, 'index': None, 'y': 0}
-    
-    def move_item(self, old_index, new_index):
-        """移动列表项"""
-        if old_index == new_index:
-            return
-            
-        # 移动文件列表中的项
-        item = self.pdf_files.pop(old_index)
-        self.pdf_files.insert(new_index, item)
-        
-        # 移动显示列表中的项
-        text = self.file_listbox.get(old_index)
-        self.file_listbox.delete(old_index)
-        self.file_listbox.insert(new_index, text)
-        
-        # 保持选中状态
-        self.file_listbox.selection_clear(0, tk.END)
-        self.file_listbox.selection_set(new_index)
-        self.file_listbox.activate(new_index)
-        
-        # 更新预览
-        self.preview_pdf(self.pdf_files[new_index])
+        """结束拖拽：顺序变化后才同步页面总览和页面编排"""
+        drag, self.drag_data = self.drag_data, None
+        if drag is None:
+            return None
+        if drag['moved']:
+            self.flush_rows()
+            self.on_files_changed()
+        elif drag['collapse']:
+            self.file_listbox.selection_clear(0, tk.END)
+            self.file_listbox.selection_set(drag['index'])
+            self.file_listbox.activate(drag['index'])
+            self.on_select_file(None)
+        return None
 
 # 在程序开始时转换图标
 if __name__ == "__main__":
+    # 打包后的程序中启动进程池（批量解析、合并、压缩输出）需要
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = PDFMergerApp(root)
     root.mainloop() 
\ No newline at end of file
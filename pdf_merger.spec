@@ -1,6 +1,7 @@
 # -*- mode: python ; coding: utf-8 -*-
 
 import os
+import sys
 import tempfile
 from PIL import Image
 
@@ -209,11 +210,17 @@ for dll in core_dlls:
 binaries.append((poppler_path, 'poppler'))
 log(f"添加 poppler 目录: {poppler_path}")
 
+# 预先生成窗口图标，程序启动时直接加载，不再在运行时转换 icon.png
+sys.path.insert(0, SPECPATH)
+from icon_assets import build_window_icons
+window_icons = build_window_icons(png_path, os.path.join(tempfile.gettempdir(), 'pdfmerger_icons'))
+log(f"已生成窗口图标: {', '.join(window_icons)}")
+
 a = Analysis(
     ['pdf_merger.py'],
     pathex=[],
     binaries=binaries,
-    datas=[('icon.png', '.')],
+    datas=[(path, '.') for path in window_icons],
     hiddenimports=[
         'pkg_resources.py2_warn',
     ],
@@ -0,0 +1,71 @@
+"""输入文件的内存映射读取
+
+PdfReader(路径) 会先把整个文件读入 BytesIO 再解析，多 GB 的扫描件因此在进程中
+多出一份完整副本，而且要等全部读完才能开始解析。这里改为用 mmap 只读映射文件：
+
+- PyPDF2 直接在映射上解析，只有实际访问到的对象才会被读入；
+- PyMuPDF 通过 memoryview 打开映射，不复制文件内容；
+- 映射与系统页缓存共享物理内存，预览、索引和合并（包括进程池中的子进程）
+  同时打开同一文件时不会各自复制一份。
+
+每个使用者各自建立映射（各有独立的读取位置，可在不同线程中使用），
+映射在最后一个引用释放时自动解除。文件小于 MMAP_THRESHOLD、为空或无法映射
+（如 32 位 Python 中的超大文件）时退回普通的文件读取。
+
+注意：映射期间若有程序原地截断该文件，访问被截掉的部分会导致进程崩溃（SIGBUS）；
+以写新文件再替换的方式更新输入（绝大多数程序的做法）不受影响。
+"""
+import io
+import mmap
+import os
+from contextlib import contextmanager
+
+# 小文件直接读入内存更快，映射的收益只在大文件上明显
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def map_file(path):
+    """以只读方式打开 path，返回支持 read/seek/tell 的对象（通常是 mmap）"""
+    with open(path, 'rb') as f:
+        mapped = _map(f)
+        return mapped if mapped is not None else io.BytesIO(f.read())
+
+
+def _map(f):
+    """映射整个文件；文件太小或无法映射时返回 None"""
+    if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+        return None
+    try:
+        # mmap 会复制文件描述符，关闭 f 不影响映射
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, OverflowError, ValueError):
+        return None
+
+
+def open_pdf_reader(path, strict=False):
+    """在 map_file() 返回的对象上创建 PdfReader"""
+    from PyPDF2 import PdfReader
+
+    return PdfReader(map_file(path), strict=strict)
+
+
+@contextmanager
+def mapped_reader(path, strict=False):
+    """with mapped_reader(path) as reader: ...，结束时立即解除映射，不等垃圾回收
+
+    只适用于用完即弃的读取；退出后 reader 及其页面对象不能再访问。
+    """
+    reader = open_pdf_reader(path, strict)
+    try:
+        yield reader
+    finally:
+        reader.stream.close()
+
+
+def open_fitz_document(fitz, path):
+    """用 PyMuPDF 打开 path；能映射时以 memoryview 传入，不复制文件内容"""
+    with open(path, 'rb') as f:
+        mapped = _map(f)
+    if mapped is None:
+        return fitz.open(path)
+    return fitz.open(stream=memoryview(mapped), filetype='pdf')
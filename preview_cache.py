@@ -0,0 +1,274 @@
+"""预览图像缓存
+
+- PreviewCache: 内存中的 LRU 缓存，按字节数限额
+- DiskRenderCache: 磁盘上的持久渲染缓存，重启后仍可复用
+"""
+import hashlib
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+def image_nbytes(img):
+    """估算 PIL.Image 占用的内存字节数"""
+    return img.width * img.height * len(img.getbands())
+
+
+class PreviewCache:
+    """按字节数限制容量的 LRU 图像缓存
+
+    键为元组，第一个元素是 PDF 文件路径，例如 (pdf_path, page)，
+    以便按文档整体失效而不必遍历所有条目。
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (image, nbytes)
+        self._keys_by_document = {}    # pdf_path -> set(key)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """命中时返回图像并标记为最近使用，未命中返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, img):
+        nbytes = image_nbytes(img)
+        with self._lock:
+            self._remove(key)
+            if nbytes > self.max_bytes:
+                # 单张图像超过总预算时不缓存
+                return
+            self._entries[key] = (img, nbytes)
+            self._keys_by_document.setdefault(key[0], set()).add(key)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._remove(old_key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.current_bytes -= entry[1]
+        keys = self._keys_by_document.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_document[key[0]]
+
+    def invalidate_document(self, pdf_path):
+        """移除某个文档的全部缓存条目"""
+        with self._lock:
+            for key in list(self._keys_by_document.get(pdf_path, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_document.clear()
+            self.current_bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """返回命中、未命中、淘汰次数及当前占用"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def default_cache_dir():
+    """渲染缓存的默认目录"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        return os.path.join(base, 'PDFMerger', 'render_cache')
+    if sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'pdfmerger', 'render_cache')
+
+
+def file_identity(pdf_path):
+    """文件身份：大小 + 修改时间 + inode，文件被修改或替换后随之改变"""
+    st = os.stat(pdf_path)
+    return f"{os.path.abspath(pdf_path)}|{st.st_size}|{st.st_mtime_ns}|{st.st_ino}"
+
+
+class DiskRenderCache:
+    """磁盘渲染缓存
+
+    键由文件身份（大小、修改时间、inode）、页码、DPI 和渲染尺寸组成。
+    条目以未压缩像素经 zlib 快速压缩后存储，读取时无需 PNG 解码。
+    总大小超过 max_bytes 时按最近访问时间淘汰。
+    """
+
+    MAGIC = b'PMRC1'
+    HEADER = struct.Struct('<4sII')  # 模式、宽、高
+    SUFFIX = '.rc'
+
+    def __init__(self, cache_dir=None, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None  # 文件名 -> [大小, 访问时间]，首次使用时扫描
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self.current_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(self.SUFFIX):
+                st = entry.stat()
+                self._index[entry.name] = [st.st_size, st.st_mtime]
+                self.current_bytes += st.st_size
+
+    def make_key(self, pdf_path, page, dpi, size=None):
+        """生成缓存键；文件不存在时返回 None"""
+        try:
+            identity = file_identity(pdf_path)
+        except OSError:
+            return None
+        raw = f"{identity}|{page}|{dpi}|{size}".encode('utf-8')
+        return hashlib.sha1(raw).hexdigest() + self.SUFFIX
+
+    def get(self, key):
+        if key is None:
+            return None
+        path = os.path.join(self.cache_dir, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            img = self._decode(data)
+        except (OSError, ValueError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if self._index is not None and key in self._index:
+                self._index[key][1] = time.time()
+        # 更新修改时间作为最近访问记录，重启后仍能按 LRU 淘汰
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return img
+
+    def put(self, key, img):
+        if key is None:
+            return
+        data = self._encode(img)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._load_index()
+            path = os.path.join(self.cache_dir, key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                return
+
+            old = self._index.get(key)
+            if old is not None:
+                self.current_bytes -= old[0]
+            self._index[key] = [len(data), time.time()]
+            self.current_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        if self.current_bytes <= self.max_bytes:
+            return
+        for name, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            del self._index[name]
+            self.current_bytes -= size
+            self.evictions += 1
+            if self.current_bytes <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for name in list(self._index):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+            self._index.clear()
+            self.current_bytes = 0
+
+    def _encode(self, img):
+        if img.mode not in ('RGB', 'L', 'RGBA', '1'):
+            img = img.convert('RGB')
+        header = self.HEADER.pack(img.mode.encode('ascii').ljust(4), img.width, img.height)
+        return self.MAGIC + header + zlib.compress(img.tobytes(), 1)
+
+    def _decode(self, data):
+        from PIL import Image
+
+        if not data.startswith(self.MAGIC):
+            raise ValueError("无效的缓存文件")
+        offset = len(self.MAGIC)
+        mode, width, height = self.HEADER.unpack_from(data, offset)
+        pixels = zlib.decompress(data[offset + self.HEADER.size:])
+        return Image.frombytes(mode.rstrip().decode('ascii'), (width, height), pixels)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index or ()),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
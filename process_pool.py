@@ -0,0 +1,32 @@
+"""有上限的进程池任务窗口
+
+合并（序列化各输入文件）和输出优化（重新编码图像）都要把一串任务交给进程池、
+再按原顺序逐个取回结果。imap_ordered() 统一处理这一模式。
+"""
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def imap_ordered(function, tasks, workers):
+    """在 workers 个进程中执行 function(task)，按任务顺序逐个产出 (task, 结果)
+
+    同时在途的任务最多 workers * 2 个：任务数据不会一次性全部复制到子进程，
+    已完成但尚未取走的结果也不会无限堆积在内存中。function 须为模块级函数。
+    出错、取消或生成器被提前关闭时不再启动排队中的任务。
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        window = deque()
+        remaining = iter(tasks)
+        try:
+            for task in itertools.islice(remaining, workers * 2):
+                window.append((task, executor.submit(function, task)))
+            while window:
+                task, future = window.popleft()
+                result = future.result()
+                for next_task in itertools.islice(remaining, 1):
+                    window.append((next_task, executor.submit(function, next_task)))
+                yield task, result
+        finally:
+            for _, future in window:
+                future.cancel()
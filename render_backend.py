@@ -0,0 +1,297 @@
+"""PDF 页面渲染后端
+
+- MuPDFRenderer: 进程内渲染，文档在多次请求之间保持打开，翻页无需启动新进程
+- SubprocessRenderer: 每页调用一次 pdftoppm，作为后备；默认通过管道读取
+  未压缩的 PPM，不写临时文件
+
+create_renderer() 会优先选择进程内渲染，不可用时回退到 pdftoppm。
+PyMuPDF 和 PIL 导入较慢，在首次渲染时才导入，不影响程序启动速度。
+"""
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+
+from instrumentation import timed
+from pdf_source import open_fitz_document
+
+_fitz = None
+_fitz_loaded = False
+_fitz_lock = threading.Lock()
+
+
+def load_fitz():
+    """按需导入 PyMuPDF，未安装时返回 None"""
+    global _fitz, _fitz_loaded
+    with _fitz_lock:
+        if not _fitz_loaded:
+            try:
+                import pymupdf as fitz
+            except ImportError:
+                try:
+                    import fitz
+                except ImportError:
+                    fitz = None
+            _fitz = fitz
+            _fitz_loaded = True
+        return _fitz
+
+
+class RenderError(Exception):
+    """页面渲染失败"""
+
+
+def find_pdftoppm(poppler_path=None):
+    """在 poppler 目录或 PATH 中查找 pdftoppm 可执行文件"""
+    if poppler_path:
+        for name in ('pdftoppm.exe', 'pdftoppm'):
+            candidate = os.path.join(poppler_path, name)
+            if os.path.exists(candidate):
+                return candidate
+    return shutil.which('pdftoppm')
+
+
+def _file_signature(pdf_path):
+    st = os.stat(pdf_path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+class SubprocessRenderer:
+    """每次渲染启动一个 pdftoppm 进程
+
+    默认使用管道模式：pdftoppm 将未压缩的 PPM/PGM 写到标准输出，
+    直接在内存中解码，不经过磁盘。use_pipe=False 时回退到写临时 PNG 文件。
+    """
+
+    name = 'pdftoppm'
+
+    def __init__(self, poppler_path=None, use_pipe=True, gray=False):
+        self.use_pipe = use_pipe
+        self.gray = gray
+        self.pdftoppm_path = find_pdftoppm(poppler_path)
+        if self.pdftoppm_path is None:
+            # 保持原有行为：找不到时仍按 poppler 目录拼出路径，由 Popen 报错
+            self.pdftoppm_path = os.path.join(poppler_path or '', 'pdftoppm.exe')
+
+        # 建 STARTUPINFO 对象来隐藏窗口
+        self.startupinfo = None
+        if os.name == 'nt':  # Windows 系统
+            self.startupinfo = subprocess.STARTUPINFO()
+            self.startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            self.startupinfo.wShowWindow = subprocess.SW_HIDE
+
+    def _run(self, cmd):
+        with timed('spawn', backend=self.name):
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                startupinfo=self.startupinfo
+            )
+        with timed('render', backend=self.name):
+            stdout, stderr = process.communicate()
+        return process.returncode, stdout, stderr.decode(errors='replace').strip()
+
+    def render_page(self, pdf_path, page, dpi=150, scale_to=None):
+        """渲染第 page 页（从0开始），返回 PIL.Image
+
+        指定 scale_to 时直接输出长边为 scale_to 像素的图像，忽略 dpi。
+        """
+        cmd = [
+            self.pdftoppm_path,
+            '-f', str(page + 1),
+            '-l', str(page + 1),
+        ]
+        if scale_to:
+            cmd += ['-scale-to', str(scale_to)]
+        else:
+            cmd += ['-r', str(dpi)]
+        if self.gray:
+            cmd.append('-gray')
+
+        if self.use_pipe:
+            return self._render_to_pipe(cmd, pdf_path)
+        return self._render_to_file(cmd, pdf_path)
+
+    def _render_to_pipe(self, cmd, pdf_path):
+        from PIL import Image
+
+        # 不指定输出前缀时 pdftoppm 将 PPM（灰度时为 PGM）写到标准输出
+        returncode, stdout, stderr = self._run(cmd + [pdf_path])
+        if returncode != 0 or not stdout:
+            raise RenderError(stderr or "pdftoppm 未输出图像")
+        with timed('decode', backend=self.name):
+            img = Image.open(io.BytesIO(stdout))
+            img.load()
+        return img
+
+    def _render_to_file(self, cmd, pdf_path):
+        from PIL import Image
+
+        # 每次渲染使用独立的临时目录，避免并发渲染或多个实例互相覆盖
+        with tempfile.TemporaryDirectory(prefix='pdfmerger_') as temp_dir:
+            output_root = os.path.join(temp_dir, 'preview')
+            _, _, stderr = self._run(cmd + ['-png', '-singlefile', pdf_path, output_root])
+
+            # 检查输出文件是否存在
+            output_file = output_root + '.png'
+            if not os.path.exists(output_file):
+                raise RenderError(stderr or "pdftoppm 未生成图像")
+            with timed('decode', backend=self.name), Image.open(output_file) as img:
+                img.load()
+                return img.copy()
+
+    def close_document(self, pdf_path):
+        pass
+
+    def close(self):
+        pass
+
+
+class MuPDFRenderer:
+    """使用 PyMuPDF 在进程内渲染，最近使用的文档保持打开"""
+
+    name = 'mupdf'
+
+    def __init__(self, max_open_documents=8):
+        self._fitz = load_fitz()
+        if self._fitz is None:
+            raise RenderError("未安装 PyMuPDF")
+        self.max_open_documents = max_open_documents
+        self._documents = OrderedDict()  # pdf_path -> (文件签名, fitz.Document)
+        self._lock = threading.Lock()
+
+    def _get_document(self, pdf_path):
+        signature = _file_signature(pdf_path)
+        entry = self._documents.get(pdf_path)
+        if entry is not None:
+            if entry[0] == signature:
+                self._documents.move_to_end(pdf_path)
+                return entry[1]
+            # 文件已被修改，重新打开
+            entry[1].close()
+            del self._documents[pdf_path]
+
+        doc = open_fitz_document(self._fitz, pdf_path)
+        if doc.needs_pass:
+            doc.authenticate('')
+        self._documents[pdf_path] = (signature, doc)
+        while len(self._documents) > self.max_open_documents:
+            _, (_, old_doc) = self._documents.popitem(last=False)
+            old_doc.close()
+        return doc
+
+    def render_page(self, pdf_path, page, dpi=150, scale_to=None):
+        """渲染第 page 页（从0开始），返回 PIL.Image
+
+        指定 scale_to 时直接输出长边为 scale_to 像素的图像，忽略 dpi。
+        """
+        from PIL import Image
+
+        with self._lock:
+            try:
+                with timed('render', backend=self.name, page=page):
+                    pdf_page = self._get_document(pdf_path)[page]
+                    if scale_to:
+                        # page.rect 已考虑页面自身的 /Rotate
+                        zoom = scale_to / max(pdf_page.rect.width, pdf_page.rect.height)
+                        pix = pdf_page.get_pixmap(matrix=self._fitz.Matrix(zoom, zoom), alpha=False)
+                    else:
+                        pix = pdf_page.get_pixmap(dpi=dpi, alpha=False)
+            except Exception as e:
+                raise RenderError(str(e)) from e
+            with timed('decode', backend=self.name):
+                return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+
+    def close_document(self, pdf_path):
+        with self._lock:
+            entry = self._documents.pop(pdf_path, None)
+            if entry is not None:
+                entry[1].close()
+
+    def close(self):
+        with self._lock:
+            for _, doc in self._documents.values():
+                doc.close()
+            self._documents.clear()
+
+
+# 预览渲染尺寸档位（长边像素数）。渲染时取不小于显示需要的最小档位，
+# 窗口大小在同一档位内变化时可直接复用已渲染的图像
+RENDER_BUCKETS = (320, 480, 640, 800)
+
+
+def choose_bucket(page_width, page_height, rotation, box_width, box_height, max_side=800):
+    """根据页面尺寸（点）、总旋转角度和预览区域大小选择渲染档位"""
+    if box_width <= 1 or box_height <= 1:
+        return RENDER_BUCKETS[-1]  # 窗口尚未显示，按最大档位渲染
+    if rotation % 180:
+        page_width, page_height = page_height, page_width
+    needed = max(fit_size(page_width, page_height, box_width, box_height, max_side))
+    for bucket in RENDER_BUCKETS:
+        if bucket >= needed:
+            return bucket
+    return RENDER_BUCKETS[-1]
+
+
+# 顺时针旋转角度 -> 无损转置操作（Pillow 的 ROTATE_* 为逆时针方向）
+_TRANSPOSE_FOR_ROTATION = {
+    90: 'ROTATE_270',
+    180: 'ROTATE_180',
+    270: 'ROTATE_90',
+}
+
+
+def fit_size(width, height, box_width, box_height, max_side=800):
+    """按原有预览规则计算适应预览区域的尺寸（长边不超过 max_side）"""
+    img_ratio = width / height
+    if img_ratio > box_width / box_height:
+        new_width = min(box_width, max_side)
+        new_height = int(new_width / img_ratio)
+    else:
+        new_height = min(box_height, max_side)
+        new_width = int(new_height * img_ratio)
+    return max(new_width, 1), max(new_height, 1)
+
+
+def make_display_image(img, rotation, box_width, box_height, max_side=800,
+                       resample=None):
+    """先缩放到显示尺寸，再用无损转置旋转
+
+    旋转只作用于已缩小的图像，且 90° 的倍数用 transpose 完成，
+    不再对整张高分辨率图像做双三次插值旋转。
+    resample 默认为 BILINEAR，拖动窗口边缘期间可传入 NEAREST 以降低每帧开销。
+    """
+    from PIL import Image
+
+    if resample is None:
+        resample = Image.Resampling.BILINEAR
+    rotation %= 360
+    quarter_turn = rotation in (90, 270)
+    if box_width > 1 and box_height > 1:
+        width, height = (img.height, img.width) if quarter_turn else img.size
+        new_width, new_height = fit_size(width, height, box_width, box_height, max_side)
+        size = (new_height, new_width) if quarter_turn else (new_width, new_height)
+        if size != img.size:
+            with timed('resize'):
+                img = img.resize(size, resample)
+    transpose = _TRANSPOSE_FOR_ROTATION.get(rotation)
+    if transpose is not None:
+        with timed('rotate'):
+            img = img.transpose(Image.Transpose[transpose])
+    return img
+
+
+def create_renderer(poppler_path=None, prefer='auto'):
+    """创建渲染器
+
+    prefer: 'auto' 优先进程内渲染；'mupdf' / 'pdftoppm' 指定后端。
+    """
+    if prefer in ('auto', 'mupdf') and load_fitz() is not None:
+        return MuPDFRenderer()
+    if prefer == 'mupdf':
+        raise RenderError("未安装 PyMuPDF")
+    return SubprocessRenderer(poppler_path)
@@ -0,0 +1,116 @@
+"""后台渲染调度
+
+渲染在工作线程中执行，结果通过 Tk 的 after() 回到主线程，
+界面在渲染期间不会卡住。切换文件时调用 cancel_pending() 丢弃过期任务。
+"""
+import itertools
+import queue
+import threading
+
+# 优先级数值越小越先执行
+PRIORITY_VISIBLE = 0
+PRIORITY_PREFETCH = 10
+
+
+class RenderScheduler:
+    """带优先级的后台渲染队列
+
+    submit() 与 cancel_pending() 只能在 Tk 主线程调用；
+    回调 callback(result, error) 也总是在主线程执行。
+    """
+
+    def __init__(self, root, workers=1, poll_interval=15):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._jobs = queue.PriorityQueue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = {}  # key -> 回调列表
+        self._in_flight = 0
+        self._generation = 0
+        self._sequence = itertools.count()
+        self._polling = False
+        self._stopped = False
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(
+                target=self._worker, name=f"render-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, func, callback=None, priority=PRIORITY_VISIBLE):
+        """提交渲染任务；同一 key 的任务在完成前只会执行一次"""
+        with self._lock:
+            callbacks = self._pending.get(key)
+            is_new = callbacks is None
+            if is_new:
+                callbacks = self._pending[key] = []
+            if callback is not None:
+                callbacks.append(callback)
+            generation = self._generation
+        # 已排队的任务再次以更高优先级提交时追加一条，先出队的那条负责执行
+        if is_new or priority == PRIORITY_VISIBLE:
+            self._jobs.put((priority, next(self._sequence), generation, key, func))
+        self._ensure_polling()
+
+    def prefetch(self, keys_and_funcs):
+        """按给定顺序以预取优先级排队，靠前的先渲染"""
+        for distance, (key, func) in enumerate(keys_and_funcs):
+            self.submit(key, func, priority=PRIORITY_PREFETCH + distance)
+
+    def cancel_pending(self):
+        """丢弃所有尚未开始的任务，正在执行的任务结果不再回调"""
+        with self._lock:
+            self._generation += 1
+            self._pending.clear()
+
+    def shutdown(self):
+        self._stopped = True
+        self.cancel_pending()
+        for _ in self._threads:
+            self._jobs.put((-1, next(self._sequence), None, None, None))
+
+    def _worker(self):
+        while True:
+            _, _, generation, key, func = self._jobs.get()
+            if func is None:
+                return
+            with self._lock:
+                if generation != self._generation or key not in self._pending:
+                    continue  # 已取消或已由另一条任务完成
+                callbacks = self._pending.pop(key)
+                self._in_flight += 1
+
+            result = error = None
+            try:
+                result = func()
+            except Exception as e:
+                error = e
+            self._results.put((generation, callbacks, result, error))
+            with self._lock:
+                self._in_flight -= 1
+
+    def _ensure_polling(self):
+        if not self._polling and not self._stopped:
+            self._polling = True
+            self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        """在主线程中分发已完成的结果"""
+        while True:
+            try:
+                generation, callbacks, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue
+            for callback in callbacks:
+                callback(result, error)
+
+        with self._lock:
+            busy = bool(self._pending) or self._in_flight > 0
+        if (busy or not self._results.empty()) and not self._stopped:
+            self.root.after(self.poll_interval, self._poll)
+        else:
+            self._polling = False
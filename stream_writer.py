@@ -0,0 +1,485 @@
+"""流式 PDF 写入器
+
+PdfWriter 会把所有输入页面保存在内存中，最后一次性写出。
+StreamingPdfWriter 在处理每个输入文件时立即把它引用到的对象写入输出，
+处理完即可释放对应的 PdfReader，峰值内存只与最大的单个输入有关。
+内存中只保留每个对象的偏移量和页面对象编号。
+
+写出分两步：
+1. build_fragment() 把一个输入的页面及其引用的对象序列化为可重定位的
+   DocumentFragment：对象使用局部编号，引用以占位符保存。这一步只依赖
+   单个输入，可以在子进程中并行执行。
+2. StreamingPdfWriter.add_fragment() 按顺序为片段分配输出编号并写出。
+   串行与并行使用同一个写出步骤，因此输出字节完全一致。
+
+dedup=True 时对每个对象（包括字体、图像、ICC 配置等流对象）按序列化后的
+内容计算摘要，内容相同的对象只写出一份，其余引用都指向这份共享副本。
+片段中子对象总是排在父对象之前，因此引用了相同子对象的字典也能被识别为重复。
+
+object_streams=True 时非流对象每 OBJECT_STREAM_SIZE 个打包进一个压缩的对象流
+（/ObjStm），交叉引用改为写出压缩的交叉引用流（PDF 1.5 起支持）。
+"""
+import hashlib
+import itertools
+import zlib
+
+from PyPDF2.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    StreamObject,
+)
+
+# 对象 1 和 2 预留给目录（Catalog）和页面树根节点（Pages），在 close() 时写出
+CATALOG_ID = 1
+PAGES_ID = 2
+
+# 页面字典中不复制的键：/Parent 改为指向新的页面树，结构树不随页面复制
+_PAGE_EXCLUDED_KEYS = ('/Parent', '/StructParents')
+
+# 每个对象流中打包的对象数
+OBJECT_STREAM_SIZE = 100
+
+# 去重时允许共享的 /Subtype：XObject（图像、表单）和字体（含嵌入字体程序）
+_SHAREABLE_SUBTYPES = frozenset((
+    '/Image', '/Form', '/PS',
+    '/Type0', '/Type1', '/MMType1', '/Type3', '/TrueType', '/CIDFontType0', '/CIDFontType2',
+    '/Type1C', '/CIDFontType0C', '/OpenType',
+))
+
+_ON_STACK = 1
+_DONE = 2
+
+
+class DocumentFragment:
+    """单个输入序列化后的结果，可在进程之间传递
+
+    objects 中每项为 (局部编号, 片段列表, 是否可去重)，片段列表由字节串和
+    表示引用的局部编号（int）交替组成。子对象总是排在引用它的父对象之前；
+    pinned 中的对象（页面和循环引用的目标）在写出前预先分配编号。
+    """
+
+    __slots__ = ('page_locals', 'pinned', 'objects')
+
+    def __init__(self, page_locals, pinned, objects):
+        self.page_locals = page_locals
+        self.pinned = pinned
+        self.objects = objects
+
+
+class OutputLayout:
+    """写出完成后的文件结构，供增量更新（见 incremental.py）定位页面对象
+
+    page_offsets 为 {页面对象编号: 文件偏移}；size 为交叉引用表的 /Size。
+    """
+
+    __slots__ = ('page_ids', 'page_offsets', 'xref_offset', 'size')
+
+    def __init__(self, page_ids, page_offsets, xref_offset, size):
+        self.page_ids = page_ids
+        self.page_offsets = page_offsets
+        self.xref_offset = xref_offset
+        self.size = size
+
+
+class StreamingPdfWriter:
+    """边读边写的 PDF 写入器
+
+    用法::
+
+        with open(output_path, 'wb') as f:
+            writer = StreamingPdfWriter(f)
+            for path in inputs:
+                writer.add_document(PdfReader(path), rotations.get(path, {}))
+            writer.close()
+    """
+
+    def __init__(self, stream, pdf_version='1.7', dedup=False, object_streams=False):
+        self._stream = stream
+        self.dedup = dedup
+        self.object_streams = object_streams
+        self._packed = {}          # 对象编号 -> (对象流编号, 流内序号)
+        self._pending = []         # 尚未打包的 (对象编号, 内容)
+        self._shared_objects = {}  # 对象内容摘要 -> 输出对象编号
+        self.dedup_objects = 0
+        self.dedup_bytes_saved = 0
+        self._offsets = {}
+        self._next_id = PAGES_ID + 1
+        self.page_ids = []
+        self.closed = False
+        self.xref_offset = None
+        self._position = 0
+        self._write(f"%PDF-{pdf_version}\n".encode('ascii') + b"%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def bytes_written(self):
+        return self._position
+
+    def _write(self, data):
+        self._stream.write(data)
+        self._position += len(data)
+
+    def _allocate_id(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def add_document(self, reader, rotations=None):
+        """写出 reader 的全部页面及其引用的对象
+
+        rotations: {页码(从0开始): 顺时针角度}，在原有 /Rotate 基础上叠加。
+        返回写出的页数。调用返回后 reader 不再被引用。
+        """
+        return self.add_fragment(build_fragment(reader, rotations))
+
+    def add_fragment(self, fragment):
+        """为片段分配输出编号并写出，返回写出的页数"""
+        final_ids = {local: self._allocate_id() for local in fragment.pinned}
+
+        for local, segments, shareable in fragment.objects:
+            body = b''.join(
+                segment if segment.__class__ is bytes else b'%d 0 R' % final_ids[segment]
+                for segment in segments
+            )
+            obj_id = final_ids.get(local)
+            if obj_id is not None:
+                self._write_body(obj_id, body)
+                continue
+
+            digest = None
+            if self.dedup and shareable:
+                digest = hashlib.sha256(body).digest()
+                shared_id = self._shared_objects.get(digest)
+                if shared_id is not None:
+                    self.dedup_objects += 1
+                    self.dedup_bytes_saved += len(body)
+                    final_ids[local] = shared_id
+                    continue
+
+            obj_id = final_ids[local] = self._allocate_id()
+            self._write_body(obj_id, body)
+            if digest is not None:
+                self._shared_objects[digest] = obj_id
+
+        self.page_ids.extend(final_ids[local] for local in fragment.page_locals)
+        return len(fragment.page_locals)
+
+    def _write_body(self, obj_id, body):
+        if self.object_streams and not body.endswith(b"\nendstream"):
+            self._pending.append((obj_id, body))
+            if len(self._pending) >= OBJECT_STREAM_SIZE:
+                self._flush_object_stream()
+            return
+        self._offsets[obj_id] = self._position
+        self._write(f"{obj_id} 0 obj\n".encode('ascii') + body + b"\nendobj\n")
+
+    def _flush_object_stream(self):
+        """把待打包的对象写成一个 /ObjStm"""
+        if not self._pending:
+            return
+        stream_id = self._allocate_id()
+        header = []
+        bodies = []
+        offset = 0
+        for index, (obj_id, body) in enumerate(self._pending):
+            header.append(f"{obj_id} {offset}")
+            bodies.append(body)
+            offset += len(body) + 1
+            self._packed[obj_id] = (stream_id, index)
+        header = ' '.join(header).encode('ascii') + b"\n"
+        data = zlib.compress(header + b"\n".join(bodies) + b"\n")
+        self._offsets[stream_id] = self._position
+        self._write(
+            f"{stream_id} 0 obj\n<< /Type /ObjStm /N {len(self._pending)} /First {len(header)}"
+            f" /Filter /FlateDecode /Length {len(data)} >>\nstream\n".encode('ascii')
+            + data + b"\nendstream\nendobj\n"
+        )
+        self._pending = []
+
+    def close(self):
+        """写出页面树、目录和交叉引用表"""
+        if self.closed:
+            return
+        self._write_body(PAGES_ID, pages_tree_body(self.page_ids))
+        self._write_body(
+            CATALOG_ID,
+            f"<< /Type /Catalog /Pages {PAGES_ID} 0 R >>".encode('ascii')
+        )
+        if self.object_streams:
+            self._flush_object_stream()
+            self._write_xref_stream()
+            self.closed = True
+            return
+
+        xref_offset = self.xref_offset = self._position
+        size = self._next_id
+        lines = [f"xref\n0 {size}\n".encode('ascii'), b"0000000000 65535 f \n"]
+        for obj_id in range(1, size):
+            offset = self._offsets.get(obj_id)
+            if offset is None:
+                lines.append(b"0000000000 65535 f \n")
+            else:
+                lines.append(f"{offset:010d} 00000 n \n".encode('ascii'))
+        self._write(b''.join(lines))
+        self._write(
+            f"trailer\n<< /Size {size} /Root {CATALOG_ID} 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n".encode('ascii')
+        )
+        self.closed = True
+
+    def _write_xref_stream(self):
+        """写出交叉引用流：类型 0 空闲、1 普通对象（偏移）、2 对象流中的对象"""
+        xref_id = self._allocate_id()
+        xref_offset = self.xref_offset = self._position
+        self._offsets[xref_id] = xref_offset
+        size = self._next_id
+        width = max((xref_offset.bit_length() + 7) // 8, 1)
+        rows = [b"\x00" + bytes(width) + b"\xff\xff"]
+        for obj_id in range(1, size):
+            offset = self._offsets.get(obj_id)
+            if offset is not None:
+                rows.append(b"\x01" + offset.to_bytes(width, 'big') + b"\x00\x00")
+            elif obj_id in self._packed:
+                stream_id, index = self._packed[obj_id]
+                rows.append(b"\x02" + stream_id.to_bytes(width, 'big') + index.to_bytes(2, 'big'))
+            else:
+                rows.append(b"\x00" + bytes(width) + b"\x00\x00")
+        data = zlib.compress(b''.join(rows))
+        self._write(
+            f"{xref_id} 0 obj\n<< /Type /XRef /Size {size} /W [ 1 {width} 2 ]"
+            f" /Root {CATALOG_ID} 0 R /Filter /FlateDecode /Length {len(data)} >>\nstream\n"
+            .encode('ascii') + data + b"\nendstream\nendobj\n"
+            + f"startxref\n{xref_offset}\n%%EOF\n".encode('ascii')
+        )
+
+    def layout(self):
+        """close() 之后的 OutputLayout；页面打包在对象流中时返回 None"""
+        if not self.closed or self._packed:
+            return None
+        return OutputLayout(
+            list(self.page_ids),
+            {page_id: self._offsets[page_id] for page_id in self.page_ids},
+            self.xref_offset,
+            self._next_id
+        )
+
+
+def pages_tree_body(page_ids):
+    """页面树根节点（对象 2）的内容"""
+    kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+    return f"<< /Type /Pages /Kids [ {kids} ] /Count {len(page_ids)} >>".encode('ascii')
+
+
+def serialize_object(obj, overrides=None):
+    """序列化单个对象，间接引用保持原编号（本模块写出的对象代数均为 0）
+
+    overrides 同 _serialize_dict()，用于增量更新时改写页面的 /Rotate。
+    """
+    out = _SegmentBuffer()
+    if overrides:
+        _serialize_dict(obj, out, _keep_reference, overrides, ())
+    else:
+        _serialize(obj, out, _keep_reference)
+    return b''.join(
+        segment if segment.__class__ is bytes else b'%d 0 R' % segment
+        for segment in out.getvalue()
+    )
+
+
+def _keep_reference(ref):
+    return ref.idnum
+
+
+def build_fragment(reader, rotations=None, selection=None):
+    """把 reader 的页面序列化为 DocumentFragment
+
+    默认取全部页面，旋转取自 rotations；selection 为 [(页码, 旋转), ...] 时
+    只按此顺序取指定页面，同一页可出现多次（各自成为独立的页面对象）。
+    """
+    if selection is None:
+        rotations = rotations or {}
+        return _build_fragment(
+            (page, rotations.get(page_num, 0)) for page_num, page in enumerate(reader.pages)
+        )
+    pages = reader.pages
+    return _build_fragment((pages[page_num], rotation) for page_num, rotation in selection)
+
+
+def _build_fragment(pages_with_rotation):
+    counter = itertools.count(1)
+    local_ids = {}  # 源文件对象 (编号, 代数) -> 局部编号
+    targets = {}    # 已分配编号、尚未序列化的对象
+
+    # 先为所有页面分配编号，页面之间的引用（如链接注释）才能指向正确的对象
+    pages = []
+    for page, rotation in pages_with_rotation:
+        local = next(counter)
+        ref = page.indirect_reference
+        if ref is not None:
+            local_ids.setdefault((ref.idnum, ref.generation), local)
+        pages.append((local, page, rotation))
+
+    def map_reference(ref):
+        key = (ref.idnum, ref.generation)
+        local = local_ids.get(key)
+        if local is None:
+            target = ref.get_object()
+            if _is_page_node(target):
+                # 未被选中的页面（例如链接目标）不复制，否则会连带整个页面树
+                return None
+            local = local_ids[key] = next(counter)
+            targets[local] = target
+        return local
+
+    page_locals = [local for local, _, _ in pages]
+    pinned = list(page_locals)
+    pinned_set = set(pinned)
+    state = {}
+    objects = []
+
+    for local, page, rotation in pages:
+        overrides = {'/Parent': f"{PAGES_ID} 0 R".encode('ascii')}
+        if rotation:
+            overrides['/Rotate'] = str((page_rotation(page) + rotation) % 360).encode('ascii')
+        out = _SegmentBuffer()
+        _serialize_dict(page, out, map_reference, overrides, _PAGE_EXCLUDED_KEYS)
+        segments = out.getvalue()
+
+        # 非递归的后序遍历：子对象先于父对象进入 objects
+        state[local] = _ON_STACK
+        stack = [(local, segments, _references(segments), False)]
+        while stack:
+            obj_local, obj_segments, children, shareable = stack[-1]
+            for child in children:
+                child_state = state.get(child)
+                if child_state is None and child in targets:
+                    target = targets.pop(child)
+                    child_out = _SegmentBuffer()
+                    _serialize(target, child_out, map_reference)
+                    child_segments = child_out.getvalue()
+                    state[child] = _ON_STACK
+                    stack.append((child, child_segments, _references(child_segments),
+                                  _can_share(target)))
+                    break
+                if child_state == _ON_STACK and child not in pinned_set:
+                    # 循环引用：目标对象需要预先分配编号
+                    pinned.append(child)
+                    pinned_set.add(child)
+            else:
+                stack.pop()
+                state[obj_local] = _DONE
+                objects.append((obj_local, obj_segments, shareable))
+
+    return DocumentFragment(page_locals, pinned, objects)
+
+
+def _references(segments):
+    return iter([segment for segment in segments if segment.__class__ is int])
+
+
+class _SegmentBuffer:
+    """收集序列化结果：连续的字节合并为一段，引用单独作为 int 保存"""
+
+    def __init__(self):
+        self._segments = []
+        self._current = bytearray()
+
+    def write(self, data):
+        self._current += data
+
+    def add_reference(self, local):
+        self._flush()
+        self._segments.append(local)
+
+    def write_large(self, data):
+        """流数据作为独立的一段保存，避免复制"""
+        self._flush()
+        self._segments.append(bytes(data))
+
+    def _flush(self):
+        if self._current:
+            self._segments.append(bytes(self._current))
+            self._current = bytearray()
+
+    def getvalue(self):
+        self._flush()
+        return self._segments
+
+
+def page_rotation(page):
+    """页面原有的 /Rotate 角度（可能是间接对象）"""
+    rotate = page.get('/Rotate', 0)
+    if isinstance(rotate, IndirectObject):
+        rotate = rotate.get_object()
+    return int(rotate or 0) % 360
+
+
+def _is_page_node(obj):
+    if not isinstance(obj, DictionaryObject):
+        return False
+    node_type = obj.get('/Type')
+    if isinstance(node_type, IndirectObject):
+        node_type = node_type.get_object()
+    return node_type in ('/Page', '/Pages')
+
+
+def _can_share(obj):
+    """注释等与页面一一对应的对象不参与去重
+
+    注释的 /Type 可以省略，因此带 /Rect 或 /P 的字典、/Subtype 不是
+    XObject 或字体类型的字典也一律不共享。
+    """
+    if not isinstance(obj, DictionaryObject):
+        return False
+    if obj.get('/Type') in ('/Annot', '/Page', '/Pages'):
+        return False
+    if '/Rect' in obj or '/P' in obj:
+        return False
+    subtype = obj.get('/Subtype')
+    return subtype is None or subtype in _SHAREABLE_SUBTYPES
+
+
+def _serialize(obj, out, map_reference):
+    """序列化 PDF 对象，间接引用通过 map_reference 改写为局部编号"""
+    if isinstance(obj, IndirectObject):
+        local = map_reference(obj)
+        if local is None:
+            out.write(b"null")
+        else:
+            out.add_reference(local)
+    elif isinstance(obj, StreamObject):
+        data = obj._data
+        _serialize_dict(obj, out, map_reference, {'/Length': str(len(data)).encode('ascii')}, ())
+        out.write(b"\nstream\n")
+        out.write_large(data)
+        out.write(b"\nendstream")
+    elif isinstance(obj, DictionaryObject):
+        _serialize_dict(obj, out, map_reference, None, ())
+    elif isinstance(obj, ArrayObject):
+        out.write(b"[")
+        for item in list.__iter__(obj):
+            out.write(b" ")
+            _serialize(item, out, map_reference)
+        out.write(b" ]")
+    else:
+        obj.write_to_stream(out, None)
+
+
+def _serialize_dict(obj, out, map_reference, overrides, excluded_keys):
+    """序列化字典；overrides 中的值为已序列化好的字节串，替换或追加同名键"""
+    out.write(b"<<")
+    for key, value in dict.items(obj):
+        if key in excluded_keys or (overrides and key in overrides):
+            continue
+        out.write(b"\n")
+        key.write_to_stream(out, None)
+        out.write(b" ")
+        _serialize(value, out, map_reference)
+    if overrides:
+        for key, value in overrides.items():
+            out.write(b"\n")
+            NameObject(key).write_to_stream(out, None)
+            out.write(b" ")
+            out.write(value)
+    out.write(b"\n>>")
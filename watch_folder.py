@@ -0,0 +1,384 @@
+"""监视文件夹模式（无界面）
+
+扫描仪持续向输入目录投放 PDF，本模式按规则把它们分组合并：
+
+    python watch_folder.py inbox/ -o merged/ --quiet 30 --count 20 -j 4
+
+- 分组：用 --pattern 从文件名提取分组键（默认取第一个 "_" 或 "-" 之前的前缀），
+  同组文件按文件名排序后合并；组内文件数达到 --count，或最新的文件已静默
+  --quiet 秒时开始合并。
+- 只处理大小和修改时间在两次扫描之间都没有变化的文件，避免读到写了一半的文件。
+- 合并在有上限的进程池中并发执行，复用 merge_engine.merge_files。
+- 完成后源文件移到 --archive-dir/<任务号>/，失败的移到 --error-dir/<任务号>/。
+
+崩溃安全：每个任务的状态写入预写日志（journal.jsonl，每行一条，写入后 fsync）。
+认领文件时先记录 claiming，再把文件移入状态目录下的任务暂存目录，然后记录
+claimed；被认领的文件不再出现在输入目录，因此不会被重新分组。重启后按日志恢复：
+未完成认领的补完移动，已认领未合并的重新合并（输出是原子写入的，重复执行只会
+覆盖同一个文件），已合并未归档的直接归档。任何文件都不会被合并进两个任务。
+"""
+import argparse
+import errno
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from merge_engine import merge_files
+
+DEFAULT_PATTERN = r'^(.+?)[_-]'
+
+# 任务状态，按日志中出现的顺序推进
+CLAIMING = 'claiming'
+CLAIMED = 'claimed'
+MERGED = 'merged'
+FAILED = 'failed'
+DONE = 'done'
+
+
+class Journal:
+    """只追加的 JSON Lines 日志，每条记录写入后立即 fsync"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        """重放日志，返回 {任务号: 合并后的任务记录}；忽略崩溃时写坏的最后一行"""
+        jobs = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    jobs.setdefault(record['job'], {}).update(record)
+        except FileNotFoundError:
+            pass
+        return jobs
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, jobs):
+        """只保留未完成的任务，原子地替换日志文件"""
+        temp_path = self.path + '.tmp'
+        with self._lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for job in jobs.values():
+                    if job['state'] != DONE:
+                        f.write(json.dumps(job, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+
+
+def run_merge_job(inputs, output_path, dedup):
+    """进程池中执行的合并任务，返回页数"""
+    return merge_files(inputs, output_path, streaming=True, dedup=dedup).pages_done
+
+
+def _move(src, dst):
+    """移动文件；dst 一旦存在就是完整的
+
+    同一文件系统内直接 os.replace。跨设备时先复制到临时名、写盘后再改名为 dst，
+    最后删除 src；在删除前崩溃会同时留下 src 和完整的 dst，由调用方删掉 src。
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.replace(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    temp_path = dst + '.part'
+    shutil.copy2(src, temp_path)
+    with open(temp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(temp_path, dst)
+    os.remove(src)
+
+
+class FolderWatcher:
+    """轮询输入目录，按规则分组并在进程池中合并"""
+
+    def __init__(self, input_dirs, output_dir, pattern=DEFAULT_PATTERN, count=0,
+                 quiet=30.0, workers=2, interval=2.0, dedup=False, state_dir=None,
+                 archive_dir=None, error_dir=None, log=None):
+        self.input_dirs = [os.path.abspath(d) for d in input_dirs]
+        self.output_dir = os.path.abspath(output_dir)
+        self.pattern = re.compile(pattern)
+        self.count = count
+        self.quiet = quiet
+        self.workers = workers
+        self.interval = interval
+        self.dedup = dedup
+        self.state_dir = os.path.abspath(state_dir or os.path.join(self.output_dir, '.watch_state'))
+        self.archive_dir = os.path.abspath(archive_dir or os.path.join(self.output_dir, 'processed'))
+        self.error_dir = os.path.abspath(error_dir or os.path.join(self.output_dir, 'failed'))
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+
+        for directory in (self.output_dir, self.state_dir, self.archive_dir, self.error_dir):
+            os.makedirs(directory, exist_ok=True)
+        self.journal = Journal(os.path.join(self.state_dir, 'journal.jsonl'))
+        self.jobs = {}       # 任务号 -> 任务记录
+        self.running = {}    # 任务号 -> Future
+        self.seen = {}       # 文件路径 -> (大小, 修改时间, 首次稳定的时刻)
+        self._sequence = 0
+        self._finished_since_compact = False
+
+    # ---- 分组 ----
+
+    def group_key(self, filename):
+        match = self.pattern.match(filename)
+        if match is None:
+            return os.path.splitext(filename)[0]
+        return match.group(1) if match.groups() else match.group(0)
+
+    def scan(self, now):
+        """扫描输入目录，返回 {分组键: [(文件路径, 稳定时刻), ...]}，只包含稳定的文件"""
+        current = {}
+        for directory in self.input_dirs:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                name = entry.name
+                if (not name.lower().endswith('.pdf') or name.startswith(('.', '~'))
+                        or not entry.is_file()):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                current[entry.path] = (st.st_size, st.st_mtime_ns)
+
+        groups = {}
+        seen = {}
+        for path, signature in current.items():
+            previous = self.seen.get(path)
+            if previous is not None and previous[:2] == signature:
+                stable_since = previous[2] if previous[2] is not None else now
+            else:
+                stable_since = None  # 首次出现或仍在写入，下一轮再看
+            seen[path] = signature + (stable_since,)
+            if stable_since is not None:
+                key = self.group_key(os.path.basename(path))
+                groups.setdefault(key, []).append((path, stable_since))
+        self.seen = seen
+        return groups
+
+    def ready_batches(self, groups, now, quiet=None):
+        """按数量或静默时间规则挑出可以合并的批次"""
+        quiet = self.quiet if quiet is None else quiet
+        batches = []
+        for key, files in sorted(groups.items()):
+            files.sort(key=lambda item: os.path.basename(item[0]))
+            paths = [path for path, _ in files]
+            if self.count:
+                while len(paths) >= self.count:
+                    batches.append((key, paths[:self.count]))
+                    paths = paths[self.count:]
+                    files = files[self.count:]
+            if paths and now - max(since for _, since in files) >= quiet:
+                batches.append((key, paths))
+        return batches
+
+    # ---- 任务 ----
+
+    def new_job_id(self):
+        self._sequence += 1
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._sequence}"
+
+    def claim(self, key, paths):
+        """把文件移入任务暂存目录；日志先于移动写入，崩溃后可补完"""
+        job_id = self.new_job_id()
+        staging = os.path.join(self.state_dir, 'jobs', job_id)
+        safe_key = re.sub(r'[\\/:*?"<>|]', '_', key)
+        job = {
+            'job': job_id,
+            'state': CLAIMING,
+            'key': key,
+            'sources': paths,
+            'staged': [os.path.join(staging, f"{i:04d}_{os.path.basename(p)}")
+                       for i, p in enumerate(paths)],
+            'output': os.path.join(self.output_dir, f"{safe_key}_{job_id}.pdf"),
+        }
+        self.journal.append(job)
+        self.jobs[job_id] = job
+        self.finish_claim(job)
+        return job
+
+    def finish_claim(self, job):
+        for src, dst in zip(job['sources'], job['staged']):
+            if os.path.exists(src):
+                if os.path.exists(dst):
+                    # 跨设备移动在删除源文件前中断：暂存的副本已完整，删掉输入目录中的
+                    # 残留，否则它会被再次分组、合并进另一个任务
+                    os.remove(src)
+                else:
+                    _move(src, dst)
+            self.seen.pop(src, None)
+        self.set_state(job, CLAIMED)
+
+    def set_state(self, job, state, **fields):
+        job['state'] = state
+        job.update(fields)
+        self.journal.append(dict(fields, job=job['job'], state=state))
+
+    def submit(self, executor, job):
+        staged = [path for path in job['staged'] if os.path.exists(path)]
+        if not staged:
+            self.set_state(job, FAILED, error="暂存的源文件不存在")
+            self.finish(job)
+            return
+        self.log(f"[{job['job']}] 合并 {len(staged)} 个文件 -> {os.path.basename(job['output'])}")
+        self.running[job['job']] = executor.submit(
+            run_merge_job, staged, job['output'], self.dedup
+        )
+
+    def collect(self):
+        """处理已完成的合并任务"""
+        for job_id, future in list(self.running.items()):
+            if not future.done():
+                continue
+            del self.running[job_id]
+            job = self.jobs[job_id]
+            try:
+                pages = future.result()
+            except Exception as e:
+                self.log(f"[{job_id}] 合并失败: {e}")
+                self.set_state(job, FAILED, error=str(e))
+            else:
+                self.log(f"[{job_id}] 完成，共 {pages} 页")
+                self.set_state(job, MERGED, pages=pages)
+            self.finish(job)
+
+    def finish(self, job):
+        """归档（或移到失败目录）暂存的源文件，任务结束"""
+        target = self.archive_dir if job['state'] == MERGED else self.error_dir
+        for staged in job['staged']:
+            if os.path.exists(staged):
+                # 去掉暂存时加的序号前缀；不同目录的同名文件保留前缀以免覆盖
+                dst = os.path.join(target, job['job'], os.path.basename(staged).split('_', 1)[1])
+                if os.path.exists(dst):
+                    dst = os.path.join(target, job['job'], os.path.basename(staged))
+                _move(staged, dst)
+        shutil.rmtree(os.path.join(self.state_dir, 'jobs', job['job']), ignore_errors=True)
+        self.set_state(job, DONE)
+        self.jobs.pop(job['job'], None)
+        self._finished_since_compact = True
+
+    def recover(self, executor):
+        """按日志恢复上次未完成的任务"""
+        self.jobs = self.journal.load()
+        for job in self.jobs.values():
+            state = job['state']
+            if state == DONE:
+                continue
+            self.log(f"[{job['job']}] 从 {state} 状态恢复")
+            if state == CLAIMING:
+                self.finish_claim(job)
+                state = job['state']
+            if state == CLAIMED:
+                self.submit(executor, job)
+            elif state in (MERGED, FAILED):
+                self.finish(job)
+        self.jobs = {job_id: job for job_id, job in self.jobs.items() if job['state'] != DONE}
+        self.journal.compact(self.jobs)
+
+    def run(self, stop_event=None, once=False):
+        """主循环；stop_event 被设置后等待进行中的任务结束再返回
+
+        once=True 时处理完当前可合并的文件后返回（忽略静默时间）。
+        """
+        stop_event = stop_event or threading.Event()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            self.recover(executor)
+            if once:
+                self.scan(time.time())  # 记录当前文件，下一次扫描即可确认是否稳定
+            while not stop_event.is_set():
+                now = time.time()
+                groups = self.scan(now)
+                batches = self.ready_batches(groups, now, quiet=0 if once else None)
+                # 进程池满时不再认领，文件留在输入目录，下一轮再处理
+                for key, paths in batches[:max(self.workers * 2 - len(self.running), 0)]:
+                    self.submit(executor, self.claim(key, paths))
+                self.collect()
+                if not self.running and self._finished_since_compact:
+                    # 空闲时压缩日志，长时间运行也不会无限增长
+                    self.journal.compact(self.jobs)
+                    self._finished_since_compact = False
+                if once and not self.running and not batches:
+                    break
+                stop_event.wait(0.1 if once else self.interval)
+
+            while self.running:
+                time.sleep(0.1)
+                self.collect()
+            self.journal.compact(self.jobs)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="监视输入目录，按分组规则自动合并PDF（无界面模式）"
+    )
+    parser.add_argument('inputs', nargs='+', help="要监视的输入目录（不递归）")
+    parser.add_argument('-o', '--output', required=True, help="合并结果的输出目录")
+    parser.add_argument(
+        '--pattern', default=DEFAULT_PATTERN,
+        help="从文件名提取分组键的正则表达式，取第一个捕获组（默认取 _ 或 - 之前的前缀）"
+    )
+    parser.add_argument('--count', type=int, default=0,
+                        help="同组文件达到该数量即合并（默认 0 表示不按数量）")
+    parser.add_argument('--quiet', type=float, default=30.0,
+                        help="同组最新文件静默多少秒后合并（默认 30）")
+    parser.add_argument('-j', '--jobs', type=int, default=2, help="同时进行的合并任务数")
+    parser.add_argument('--interval', type=float, default=2.0, help="扫描间隔秒数")
+    parser.add_argument('--dedup', action='store_true', help="合并相同的字体、图像等资源")
+    parser.add_argument('--state-dir', help="任务日志和暂存目录（默认 输出目录/.watch_state）")
+    parser.add_argument('--archive-dir', help="合并成功后源文件的去处（默认 输出目录/processed）")
+    parser.add_argument('--error-dir', help="合并失败的源文件去处（默认 输出目录/failed）")
+    parser.add_argument('--once', action='store_true',
+                        help="合并当前已有的全部文件后退出，不等待静默时间")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    watcher = FolderWatcher(
+        args.inputs, args.output,
+        pattern=args.pattern,
+        count=args.count,
+        quiet=args.quiet,
+        workers=args.jobs,
+        interval=args.interval,
+        dedup=args.dedup,
+        state_dir=args.state_dir,
+        archive_dir=args.archive_dir,
+        error_dir=args.error_dir
+    )
+    stop_event = threading.Event()
+    try:
+        watcher.run(stop_event, once=args.once)
+    except KeyboardInterrupt:
+        # 已认领的任务记录在日志中，下次启动时继续
+        print("已停止，未完成的任务将在下次启动时继续", file=sys.stderr)
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())